@@ -1,18 +1,35 @@
 """Integration ELWA myPV."""
 
+import asyncio
+from datetime import timedelta
+
 from httpcore import TimeoutException
+import voluptuous as vol
 
 from homeassistant import config_entries
-from homeassistant.components.config import entity_registry
 from homeassistant.config_entries import SOURCE_IMPORT, ConfigEntry
-from homeassistant.core import _LOGGER, HomeAssistant
-from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.const import ATTR_DEVICE_ID
+from homeassistant.core import _LOGGER, HomeAssistant, ServiceCall
+from homeassistant.exceptions import ConfigEntryNotReady, HomeAssistantError
+from homeassistant.helpers import config_validation as cv, device_registry as dr
 from homeassistant.helpers.device_registry import DeviceEntry
+from homeassistant.helpers.event import async_track_time_interval
 from homeassistant.helpers.service import async_extract_entity_ids
 
-from .communicate import MypvCommunicator
-from .const import COMM_HUB, DEV_IP, DOMAIN
-from .discovery import async_discover_mypv_devices
+from .communicate import MypvCommunicator, loaded_communicators
+from .const import COMM_HUB, DEV_IP, DISCOVERY_INTERVAL, DOMAIN
+from .discovery import (
+    async_discover_mypv_devices,
+    async_probe_device,
+    async_rebind_device,
+)
+
+ATTR_VALUES = "values"
+
+SET_SETUP_SCHEMA = vol.Schema(
+    {vol.Required(ATTR_VALUES): {cv.string: vol.Coerce(int)}},
+    extra=vol.ALLOW_EXTRA,
+)
 
 # List of platforms to support. There should be a matching .py file for each
 PLATFORMS: list[str] = [
@@ -29,12 +46,25 @@ async def async_setup(hass: HomeAssistant, config):
     """Platform setup, do nothing."""
     hass.data.setdefault(DOMAIN, {})
 
-    # Start network scan in the background to find new myPV devices
-    async def _async_run_discovery():
+    # Scan the network periodically to find new and moved myPV devices
+    async def _async_run_discovery(now=None):
         """Background task to discover devices via UDP."""
         try:
-            devices = await async_discover_mypv_devices()
+            devices = await async_discover_mypv_devices(hass, periodic=now is not None)
+            bound = {
+                device.ip
+                for comm in loaded_communicators(hass)
+                for device in comm.devices
+            }
             for device in devices:
+                # A bound address may have gone to another unit, compare serials
+                info = await async_probe_device(hass, device["ip"])
+                if info is not None:
+                    # Known serial at a new address: DHCP lease changed
+                    if async_rebind_device(hass, device["ip"], info):
+                        continue
+                elif device["ip"] in bound:
+                    continue
                 # Trigger the 'async_step_discovery' in config_flow.py
                 hass.async_create_task(
                     hass.config_entries.flow.async_init(
@@ -43,11 +73,17 @@ async def async_setup(hass: HomeAssistant, config):
                         data={"ip": device["ip"]},
                     )
                 )
-        except Exception as ex:
+        except Exception as ex:  # noqa: BLE001
             _LOGGER.error("Failed to run myPV UDP discovery: %s", ex)
 
     # Launch the discovery task without blocking HA startup
     hass.async_create_background_task(_async_run_discovery(), "mypv-discovery")
+    async_track_time_interval(
+        hass,
+        _async_run_discovery,
+        timedelta(seconds=DISCOVERY_INTERVAL),
+        cancel_on_shutdown=True,
+    )
 
     if DOMAIN not in config:
         return True
@@ -84,24 +120,80 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
 
     hass.services.async_register(DOMAIN, "reset_energy_sensor", async_reset_sensor)
 
+    async def async_set_setup(call: ServiceCall):
+        """Service call handler to write several setup values at once."""
+        devreg = dr.async_get(hass)
+        serials = set()
+        for device_id in cv.ensure_list(call.data.get(ATTR_DEVICE_ID, [])):
+            if dev_entry := devreg.async_get(device_id):
+                serials.update(
+                    ident for domain, ident in dev_entry.identifiers if domain == DOMAIN
+                )
+        targets = []
+        writes = []
+        for comm in loaded_communicators(hass):
+            for device in comm.devices:
+                if device.serial_number in serials:
+                    _LOGGER.info(
+                        "Writing setup %s to %s", call.data[ATTR_VALUES], device.name
+                    )
+                    targets.append(device)
+                    writes.append(comm.set_setup(device, call.data[ATTR_VALUES]))
+        if not writes:
+            _LOGGER.warning("No myPV device selected to write setup values to")
+        results = await asyncio.gather(*writes, return_exceptions=True)
+        failed = []
+        for device, result in zip(targets, results, strict=True):
+            if isinstance(result, BaseException):
+                _LOGGER.error("Writing setup to %s failed: %s", device.name, result)
+            if result is not True:
+                failed.append(device.name)
+        if failed:
+            raise HomeAssistantError(
+                f"Writing setup values failed for {', '.join(failed)}"
+            )
+
+    hass.services.async_register(
+        DOMAIN, "set_setup", async_set_setup, schema=SET_SETUP_SCHEMA
+    )
+
+    async def async_start_capture(call: ServiceCall):
+        """Service call handler to record all requests to capture files."""
+        for comm in loaded_communicators(hass):
+            entry_id = comm.config_entry.entry_id
+            await comm.async_start_capture(
+                hass.config.path(f"{DOMAIN}_capture_{entry_id}.jsonl")
+            )
+
+    async def async_stop_capture(call: ServiceCall):
+        """Service call handler to stop recording requests."""
+        for comm in loaded_communicators(hass):
+            await comm.async_stop_capture()
+
+    hass.services.async_register(DOMAIN, "start_capture", async_start_capture)
+    hass.services.async_register(DOMAIN, "stop_capture", async_stop_capture)
+
     try:
         comm = MypvCommunicator(hass, entry)
         hass.data.setdefault(DOMAIN, {})[entry.entry_id] = comm
         await comm.initialize()
 
-        await comm.async_refresh()
-
-        if not comm.last_update_success:
+        if not comm.devices and not comm.initializing:
+            await comm.async_close()
             raise ConfigEntryNotReady(
-                f"Update of myPV device at {entry.data[DEV_IP]} failed"
+                f"No myPV device reachable at {', '.join(comm.hosts)}"
             )
 
+        await comm.async_refresh()
+
         hass.data[DOMAIN][entry.entry_id] = {
             COMM_HUB: comm,
         }
 
         await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+        entry.async_on_unload(entry.add_update_listener(async_reload_entry))
     except (TimeoutError, TimeoutException) as ex:
+        await comm.async_close()
         raise ConfigEntryNotReady(
             f"Timeout while connecting to myPV device at {entry.data[DEV_IP]}"
         ) from ex
@@ -109,6 +201,14 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
         return True
 
 
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the entry to apply changed options."""
+    entry_data = hass.data[DOMAIN].get(entry.entry_id)
+    if isinstance(entry_data, dict) and entry_data[COMM_HUB].options == entry.options:
+        return  # data only, e.g. a device moved to a new address
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_remove_config_entry_device(
     hass: HomeAssistant, config_entry: ConfigEntry, device_entry: DeviceEntry
 ) -> bool:
@@ -123,6 +223,7 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     # details
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id)
+        entry_data = hass.data[DOMAIN].pop(entry.entry_id)
+        await entry_data[COMM_HUB].async_close()
 
     return unload_ok
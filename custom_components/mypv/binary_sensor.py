@@ -11,16 +11,13 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .const import COMM_HUB, DOMAIN
+from .const import COMM_HUB, DOMAIN, EntityDescriptor
+from .entity import MpvEntity
 
 if TYPE_CHECKING:
-    from .communicate import MypvCommunicator
     from .mypv_device import MpyDevice
 
-    CoordinatorEntity = CoordinatorEntity[MypvCommunicator]
-
 _LOGGER = logging.getLogger(__name__)
 
 
@@ -32,43 +29,44 @@ async def async_setup_entry(
     """Add all myPV binary sensor entities."""
     comm = hass.data[DOMAIN][entry.entry_id][COMM_HUB]
 
-    for device in comm.devices:
-        async_add_entities(device.binary_sensors)
+    comm.async_add_device_listener(
+        lambda device: async_add_entities(device.binary_sensors)
+    )
 
 
-class MpvBinSensor(CoordinatorEntity, BinarySensorEntity):
+class MpvBinSensor(MpvEntity, BinarySensorEntity):
     """Representation of a MyPV binary sensor."""
 
     def __init__(
         self,
         device: "MpyDevice",
         key: str,
-        info: list[Any],
+        desc: EntityDescriptor,
     ) -> None:
         """Initialize the sensor."""
-        super().__init__(device.comm)
-        self._device = device
+        super().__init__(device.comm, device.listen_context(f"data:{key}"))
+        self.device = device
         self.entity_description = BinarySensorEntityDescription(
             key=key,
             has_entity_name=True,
-            name=info[0],
+            name=desc.name,
             device_class=None,
         )
         self._attr_unique_id = (
-            f"{self._device.serial_number}_{self.entity_description.name}"
+            f"{self.device.serial_number}_{self.entity_description.name}"
         )
         self._attr_device_info = DeviceInfo(
-            identifiers={(DOMAIN, self._device.serial_number)},
-            name=self._device.name,
+            identifiers={(DOMAIN, self.device.serial_number)},
+            name=self.device.name,
             manufacturer="myPV",
-            model=self._device.model,
+            model=self.device.model,
         )
 
     @override
     def _handle_coordinator_update(self) -> None:
         key = self.entity_description.key
         try:
-            value = self._device.data[key]  # type: ignore  # noqa: PGH003
+            value = self.device.data[key]  # type: ignore  # noqa: PGH003
         except (KeyError, TypeError):
             _LOGGER.warning(
                 "Update for %s failed, key %s not found", self.entity_id, key
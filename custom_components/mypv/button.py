@@ -2,11 +2,11 @@
 
 import logging
 
-from homeassistant.components.button import ButtonDeviceClass, ButtonEntity
+from homeassistant.components.button import ButtonEntity
 from homeassistant.core import HomeAssistant
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .const import COMM_HUB, DOMAIN
+from .const import COMM_HUB, DOMAIN, EntityDescriptor
+from .entity import MpvEntity
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -18,21 +18,20 @@ async def async_setup_entry(hass: HomeAssistant, entry, async_add_entities):
     """Add all myPV button entities."""
     comm = hass.data[DOMAIN][entry.entry_id][COMM_HUB]
 
-    for device in comm.devices:
-        async_add_entities(device.buttons)
+    comm.async_add_device_listener(lambda device: async_add_entities(device.buttons))
 
 
-class MpvBoostButton(CoordinatorEntity, ButtonEntity):
+class MpvBoostButton(MpvEntity, ButtonEntity):
     """Representation of myPV button."""
 
-    def __init__(self, device, key, info) -> None:
+    def __init__(self, device, key, desc: EntityDescriptor) -> None:
         """Initialize the button."""
-        super().__init__(device.comm)
+        super().__init__(device.comm, device.listen_context())
         self.device = device
         self.comm = device.comm
         self._key = key
-        self._name = info[0]
-        self._type = info[2]
+        self._name = desc.name
+        self._type = desc.kind
 
     @property
     def name(self):
@@ -0,0 +1,107 @@
+"""Record and replay of myPV HTTP traffic for offline profiling."""
+
+import asyncio
+from collections import defaultdict, deque
+import json
+import logging
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from homeassistant.core import HomeAssistant
+
+_LOGGER = logging.getLogger(__name__)
+
+# Short field names keep the capture compact, one json object per line:
+# t: wall clock time, u: url, l: latency in s, r: response text,
+# e: error type instead of a response
+ERROR_TIMEOUT = "timeout"
+ERROR_CLIENT = "client"
+
+
+class CaptureRecorder:
+    """Append every request and its raw response to a capture file."""
+
+    def __init__(self, hass: HomeAssistant, path: str) -> None:
+        """Initialize the recorder, nothing is written before a request."""
+        self._hass = hass
+        self.path = path
+        self._lines: list[str] = []
+        self._writer: asyncio.Task | None = None
+        self.records = 0
+
+    def record(
+        self,
+        url: str,
+        latency: float,
+        text: str | None = None,
+        error: str | None = None,
+    ) -> None:
+        """Queue one request for writing."""
+        entry = {"t": round(time.time(), 3), "u": url, "l": round(latency, 4)}
+        if error is None:
+            entry["r"] = text
+        else:
+            entry["e"] = error
+        self._lines.append(json.dumps(entry, separators=(",", ":")) + "\n")
+        self.records += 1
+        if self._writer is None or self._writer.done():
+            self._writer = self._hass.async_create_background_task(
+                self._async_write(), "mypv-capture"
+            )
+
+    async def _async_write(self) -> None:
+        """Write queued lines in the executor until the queue is empty."""
+        while self._lines:
+            lines, self._lines = self._lines, []
+            await self._hass.async_add_executor_job(self._append, lines)
+
+    def _append(self, lines: list[str]) -> None:
+        """Append lines to the capture file."""
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.writelines(lines)
+
+    async def async_stop(self) -> None:
+        """Write everything still queued."""
+        if self._writer is not None:
+            await self._writer
+        await self._async_write()
+
+
+class ReplayTransport:
+    """Serve captured responses instead of requesting the devices."""
+
+    def __init__(self, entries: list[dict], speed: float = 1.0) -> None:
+        """Initialize from capture entries, speed 0 replays without delay."""
+        self.speed = speed
+        self._responses: dict[str, deque[dict]] = defaultdict(deque)
+        for entry in entries:
+            self._responses[entry["u"]].append(entry)
+        self.hosts = list(
+            dict.fromkeys(urlsplit(entry["u"]).netloc for entry in entries)
+        )
+
+    @classmethod
+    def from_file(cls, path: str, speed: float = 1.0) -> "ReplayTransport":
+        """Load a capture file, blocking."""
+        with open(path, encoding="utf-8") as file:
+            return cls([json.loads(line) for line in file if line.strip()], speed)
+
+    async def get(self, url: str) -> str:
+        """Return the next captured response of url, raise captured errors.
+
+        Responses of an url are served in captured order, then start over.
+        """
+        responses = self._responses.get(url)
+        if not responses:
+            raise aiohttp.ClientError(f"No captured response for {url}")
+        entry = responses[0]
+        responses.rotate(-1)
+        if self.speed:
+            await asyncio.sleep(entry["l"] / self.speed)
+        if entry.get("e") == ERROR_TIMEOUT:
+            raise TimeoutError
+        if "e" in entry:
+            raise aiohttp.ClientError(f"Captured {entry['e']} error for {url}")
+        return entry["r"]
@@ -1,24 +1,110 @@
 """Provides the myPV DataUpdateCoordinator."""
 
 import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
 from datetime import timedelta
+from functools import partial
+import heapq
+import itertools
 import json
 import logging
 import socket
 import time
+from typing import Any
+from urllib.parse import urlencode, urlsplit
 
 import aiohttp
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from homeassistant.util import dt as dt_util
 
-from .const import CONF_DEFAULT_INTERVAL, CONF_HOSTS, DOMAIN, UPDATE_INTERVAL
-from .mypv_device import MpyDevice
+from .capture import ERROR_CLIENT, ERROR_TIMEOUT, CaptureRecorder, ReplayTransport
+from .const import (
+    ADAPTIVE_ACTIVITY_KEYS,
+    ADAPTIVE_BACKOFF,
+    ADAPTIVE_MAX_INTERVAL,
+    ADAPTIVE_POLLING,
+    BREAKER_MAX_BACKOFF,
+    BREAKER_MIN_BACKOFF,
+    BREAKER_THRESHOLD,
+    CAPABILITY_CONFIRMATIONS,
+    CONF_DEFAULT_INTERVAL,
+    CONF_DEFAULT_PARALLEL,
+    CONF_DEFAULT_WRITE_DELAY,
+    COMM_HUB,
+    CONF_HOSTS,
+    DEV_IP,
+    DOMAIN,
+    ENERGY_MAX_GAP,
+    ENERGY_SAVE_DELAY,
+    ENERGY_VERSION,
+    FORCED_REFRESH_INTERVAL,
+    HTTP_KEEPALIVE_TIMEOUT,
+    HTTP_LIMIT_PER_HOST,
+    HTTP_TIMEOUT,
+    IGNORED_DATA_KEYS,
+    PARALLEL_POLLS,
+    SENSOR_DESCRIPTORS,
+    SENSOR_KINDS,
+    SETUP_DESCRIPTORS,
+    SETUP_POLL_INTERVAL,
+    SNAPSHOT_SAVE_DELAY,
+    SNAPSHOT_VERSION,
+    STARTUP_BUDGET,
+    UPDATE_INTERVAL,
+    WRITE_DELAY,
+)
+from .energy import EnergyAccumulator, sample_time
+from .metrics import DeviceStats
+from .mypv_device import MpyDevice, changed_keys
+from .state_parser import parse_state_text
 
 _LOGGER = logging.getLogger(__name__)
 
 
+# Data keys whose presence decides if an entity is created
+ENTITY_DATA_KEYS = (
+    frozenset(SENSOR_DESCRIPTORS) - IGNORED_DATA_KEYS - SENSOR_KINDS["sensor_always"]
+)
+
+
+def capabilities(snapshot: dict[str, Any]) -> tuple:
+    """Return what decides the entities of a device snapshot."""
+    info = snapshot["info"]
+    return (
+        info["device"],
+        info.get("acthor9s"),
+        ENTITY_DATA_KEYS.intersection(snapshot["data"]),
+        frozenset(SETUP_DESCRIPTORS).intersection(snapshot["setup"]),
+        snapshot["control"],
+    )
+
+
+def loaded_communicators(hass: HomeAssistant) -> list["MypvCommunicator"]:
+    """Return the communicators of all set up config entries."""
+    return [
+        entry_data[COMM_HUB]
+        for entry_data in hass.data.get(DOMAIN, {}).values()
+        if isinstance(entry_data, dict)  # entries being set up hold comm only
+    ]
+
+
+PRIORITY_COMMAND = 0
+PRIORITY_POLL = 1
+
+# Coalescer key of the batched setup.jsn write of a device
+SETUP_BATCH = "setup"
+
+HEALTH_HEALTHY = "healthy"
+HEALTH_DEGRADED = "degraded"
+HEALTH_OPEN = "open"
+HEALTH_HALF_OPEN = "half_open"
+
+
 def get_own_ip(def_ip):
     """Return string of own ip."""
     s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -45,7 +131,7 @@ async def detect_mypv(ip_str: str) -> list[str]:
 
     while time.time() < time_out:
         try:
-            data, addr = sock.recvfrom(1024)
+            _, addr = sock.recvfrom(1024)
             detected_ips.append(addr)
             await asyncio.sleep(0.02)
         except TimeoutError:
@@ -54,6 +140,245 @@ async def detect_mypv(ip_str: str) -> list[str]:
     return detected_ips
 
 
+class PollPlan:
+    """Poll cadence of the endpoints of one device."""
+
+    def __init__(
+        self, slow_interval: float, base_interval: float, adaptive: bool
+    ) -> None:
+        """Initialize the plan, everything is due at first."""
+        self.slow_interval = slow_interval
+        self._next_slow = 0.0
+        self.info_due = False
+        self.adaptive = adaptive
+        self.base_interval = base_interval
+        self.interval = base_interval
+        self._next_poll = 0.0
+
+    def poll_due(self, now: float) -> bool:
+        """Return True if the device is to be polled in this cycle."""
+        # Half an interval tolerance for coordinator tick jitter
+        return not self.adaptive or now >= self._next_poll - self.base_interval / 2
+
+    def poll_done(self, now: float, active: bool) -> None:
+        """Stay fast while active, else back off towards the ceiling."""
+        if active:
+            self.interval = self.base_interval
+        else:
+            self.interval = min(self.interval * ADAPTIVE_BACKOFF, ADAPTIVE_MAX_INTERVAL)
+        self._next_poll = now + self.interval
+
+    def snap(self) -> None:
+        """Poll fast again starting with the next cycle, e.g. after a command."""
+        self.interval = self.base_interval
+        self._next_poll = 0.0
+
+    def slow_due(self, now: float) -> bool:
+        """Return True if setup.jsn is due."""
+        return now >= self._next_slow
+
+    def slow_done(self, now: float) -> None:
+        """Schedule the next slow poll."""
+        self._next_slow = now + self.slow_interval
+
+    def request_slow(self) -> None:
+        """Fetch the slow tier with the next cycle, e.g. after a write."""
+        self._next_slow = 0.0
+
+
+class DeviceHealth:
+    """Circuit breaker of one device."""
+
+    def __init__(self) -> None:
+        """Initialize as healthy."""
+        self.state = HEALTH_HEALTHY
+        self.failures = 0
+        self.backoff = BREAKER_MIN_BACKOFF
+        self._next_probe = 0.0
+
+    @property
+    def available(self) -> bool:
+        """Return True if the device answers polls."""
+        return self.state in (HEALTH_HEALTHY, HEALTH_DEGRADED)
+
+    def probe_due(self, now: float) -> bool:
+        """Return True if an open breaker may probe the device again."""
+        return now >= self._next_probe
+
+    def record_success(self) -> bool:
+        """Close the breaker, return True if the device was unavailable."""
+        recovered = not self.available
+        self.state = HEALTH_HEALTHY
+        self.failures = 0
+        self.backoff = BREAKER_MIN_BACKOFF
+        return recovered
+
+    def record_failure(self, now: float) -> bool:
+        """Count a failure, return True if the device became unavailable."""
+        was_available = self.available
+        self.failures += 1
+        if self.state == HEALTH_HALF_OPEN:
+            # Probe failed, wait longer for the next one
+            self.backoff = min(self.backoff * 2, BREAKER_MAX_BACKOFF)
+            self.state = HEALTH_OPEN
+        elif self.failures >= BREAKER_THRESHOLD:
+            self.state = HEALTH_OPEN
+        else:
+            self.state = HEALTH_DEGRADED
+        if self.state == HEALTH_OPEN:
+            self._next_probe = now + self.backoff
+        return was_available and not self.available
+
+    def trip(self, now: float) -> None:
+        """Open the breaker at once, e.g. when another unit took the address."""
+        self.state = HEALTH_OPEN
+        self._next_probe = now + self.backoff
+
+
+class RequestScheduler:
+    """Limit requests in flight to one device, serve commands before polls."""
+
+    def __init__(self, limit: int) -> None:
+        """Initialize the scheduler."""
+        self.limit = limit
+        self._in_flight = 0
+        self._waiting: list[tuple[int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+        self.requests = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        # Most requests queued at once since the start of the poll cycle
+        self.depth_peak = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Return the number of queued requests."""
+        return sum(1 for _, _, fut in self._waiting if not fut.done())
+
+    @property
+    def wait_avg(self) -> float:
+        """Return the average queue wait time in seconds."""
+        return self.wait_total / self.requests if self.requests else 0.0
+
+    @asynccontextmanager
+    async def slot(self, priority: int) -> AsyncIterator[None]:
+        """Wait for a free slot, lower priority values are served first."""
+        start = time.monotonic()
+        if self._in_flight < self.limit and not self._waiting:
+            self._in_flight += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiting, (priority, next(self._order), future))
+            self.depth_peak = max(self.depth_peak, self.queue_depth)
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    self._release()  # slot was handed over already
+                raise
+        waited = time.monotonic() - start
+        self.requests += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        """Hand the slot over to the next waiting request or free it."""
+        while self._waiting:
+            _, _, future = heapq.heappop(self._waiting)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._in_flight -= 1
+
+
+class _PendingWrite:
+    """Latest value of a delayed write and the future of its result."""
+
+    def __init__(self, future: asyncio.Future) -> None:
+        """Initialize the pending write."""
+        self.future = future
+        self.value = None
+        self.send: Callable[[Any], Awaitable[bool]] | None = None
+
+
+class WriteCoalescer:
+    """Send only the latest value of writes to one device key in a window."""
+
+    def __init__(self, hass: HomeAssistant, window: float) -> None:
+        """Initialize the coalescer, window in seconds."""
+        self._hass = hass
+        self.window = window
+        self._pending: dict[tuple[str, str], _PendingWrite] = {}
+        # Held while a key is sent, the next window of the key waits for it
+        self._sending: dict[tuple[str, str], asyncio.Lock] = {}
+        # Dropped intermediate values per device serial
+        self.superseded: dict[str, int] = {}
+
+    async def async_write(
+        self, device, key: str, value, send: Callable[[Any], Awaitable[bool]]
+    ) -> bool:
+        """Queue a write, return the result of the write finally sent."""
+        pend_key = (device.serial_number, key)
+        pending = self._pending.get(pend_key)
+        if pending is None:
+            pending = self._queue(pend_key)
+        else:
+            self._supersede(device)
+        pending.value = value
+        pending.send = send
+        return await asyncio.shield(pending.future)
+
+    async def async_write_setup(self, device, key: str, value) -> bool:
+        """Queue a setup write, all setup keys of a window go in one request."""
+        pend_key = (device.serial_number, SETUP_BATCH)
+        pending = self._pending.get(pend_key)
+        if pending is None:
+            pending = self._queue(pend_key)
+            pending.value = {}
+            pending.send = partial(device.comm.set_setup, device)
+        elif key in pending.value:
+            self._supersede(device)
+        pending.value[key] = value
+        return await asyncio.shield(pending.future)
+
+    def _supersede(self, device) -> None:
+        """Count a value dropped for a newer one."""
+        serial = device.serial_number
+        self.superseded[serial] = self.superseded.get(serial, 0) + 1
+
+    def _queue(self, pend_key: tuple[str, str]) -> _PendingWrite:
+        """Create a pending write and schedule its flush."""
+        pending = _PendingWrite(self._hass.loop.create_future())
+        self._pending[pend_key] = pending
+        self._hass.async_create_background_task(
+            self._async_flush(pend_key, pending), f"mypv-write-{pend_key[1]}"
+        )
+        return pending
+
+    async def _async_flush(
+        self, pend_key: tuple[str, str], pending: _PendingWrite
+    ) -> None:
+        """Wait for the window to close, then send the latest value.
+
+        Sends of one key never overlap, values reach the device in order.
+        Writes arriving while an earlier send is in flight still join this
+        pending write.
+        """
+        await asyncio.sleep(self.window)
+        async with self._sending.setdefault(pend_key, asyncio.Lock()):
+            del self._pending[pend_key]
+            try:
+                result = await pending.send(pending.value)  # type: ignore  # noqa: PGH003
+            except Exception as err:  # noqa: BLE001
+                pending.future.set_exception(err)
+            else:
+                pending.future.set_result(result)
+
+
 class MypvCommunicator(DataUpdateCoordinator):
     """Class to perform all myPV communications."""
 
@@ -61,6 +386,8 @@ class MypvCommunicator(DataUpdateCoordinator):
         """Initialize data updater."""
         self.config_entry = entry
         self.hosts = entry.data[CONF_HOSTS]
+        # Options in effect, changes of entry data only do not reload
+        self.options = dict(entry.options)
         self._info = None
         self._setup = None
         self._next_update = 0
@@ -69,10 +396,48 @@ class MypvCommunicator(DataUpdateCoordinator):
             data = dict(entry.data)
             data[UPDATE_INTERVAL] = CONF_DEFAULT_INTERVAL
             hass.config_entries.async_update_entry(entry, data=data)
-        update_interval = timedelta(seconds=entry.data[UPDATE_INTERVAL])
+        update_interval = timedelta(
+            seconds=entry.options.get(UPDATE_INTERVAL, entry.data[UPDATE_INTERVAL])
+        )
         self.logger = _LOGGER
         self.devices = []
+        # Platform callbacks adding the entities of devices ready late
+        self._device_listeners: list[Callable[[MpyDevice], None]] = []
+        self._init_tasks: set[asyncio.Task] = set()
+        # Hosts not reachable at startup, probed again with every cycle
+        self._retry_hosts: set[str] = set()
+        # Capability snapshots per host, entities are created from them
+        self._snapshot_store: Store = Store(
+            hass, SNAPSHOT_VERSION, f"{DOMAIN}.{entry.entry_id}"
+        )
+        self._snapshots: dict[str, dict[str, Any]] = {}
+        self._capability_changes: dict[str, int] = {}
+        # Energy accumulators per device serial and power key, stored state
+        # until a device takes its accumulators
+        self._energy_store: Store = Store(
+            hass, ENERGY_VERSION, f"{DOMAIN}.{entry.entry_id}.energy"
+        )
+        self._energy: dict[str, dict[str, Any]] = {}
+        self._energy_save_pending = False
         self.hass = hass
+        self._session: aiohttp.ClientSession | None = None
+        # Diagnostic capture of all requests, replay instead of requests
+        self.recorder: CaptureRecorder | None = None
+        self.transport: ReplayTransport | None = None
+        self._poll_plans: dict[str, PollPlan] = {}
+        self._health: dict[str, DeviceHealth] = {}
+        self.schedulers: dict[str, RequestScheduler] = {}
+        self.request_stats: dict[str, DeviceStats] = {}
+        self.write_coalescer = WriteCoalescer(
+            hass, entry.options.get(WRITE_DELAY, CONF_DEFAULT_WRITE_DELAY) / 1000
+        )
+        # Changed keys per device serial, None notifies all listeners
+        self._changed: dict[str, set[str]] | None = None
+        self._next_forced_refresh = 0.0
+        self.suppressed_writes = 0
+        self._poll_limit = asyncio.Semaphore(
+            entry.options.get(PARALLEL_POLLS, CONF_DEFAULT_PARALLEL)
+        )
         super().__init__(
             hass,
             _LOGGER,
@@ -82,33 +447,439 @@ class MypvCommunicator(DataUpdateCoordinator):
         )
 
     async def initialize(self):
-        """Do the async stuff."""
+        """Initialize all hosts concurrently within the startup budget.
 
-        # detected_ips = await detect_mypv(self.hosts[0])
-        for ip_str in self.hosts:
-            try:
+        Hosts not ready within STARTUP_BUDGET continue in the background,
+        their entities are added by the platforms when they are ready.
+        """
+        self._get_session()
+        stored = await self._snapshot_store.async_load()
+        # Snapshots keyed by serial, older ones were keyed by host
+        self._snapshots = {
+            snapshot["info"]["sn"]: {"host": key, **snapshot}
+            for key, snapshot in (stored["devices"] if stored else {}).items()
+        }
+        stored = await self._energy_store.async_load()
+        self._energy = stored["devices"] if stored else {}
+        tasks = {
+            self.hass.async_create_background_task(
+                self._async_init_host(ip_str), f"mypv-init-{ip_str}"
+            )
+            for ip_str in self.hosts
+        }
+        if not tasks:
+            return
+        _, self._init_tasks = await asyncio.wait(tasks, timeout=STARTUP_BUDGET)
+        if self._init_tasks:
+            self.logger.info(
+                "%s myPV hosts not ready yet, continuing in background",
+                len(self._init_tasks),
+            )
+
+    async def _async_init_host(self, ip_str: str) -> None:
+        """Initialize the device at a host, announce it when ready."""
+        try:
+            snapshot = next(
+                (snap for snap in self._snapshots.values() if snap["host"] == ip_str),
+                None,
+            )
+            if snapshot is not None:
+                # Live data follows with the first poll
+                device = MpyDevice(self, ip_str, snapshot["info"])
+                await device.initialize_from_snapshot(snapshot)
+            else:
                 info_data = await self.check_ip(ip_str)
-                if info_data:
-                    self.devices.append(MpyDevice(self, ip_str, info_data))
-                    await self.devices[-1].initialize()
+                if not info_data:
+                    self._retry_hosts.add(ip_str)
+                    return
+                device = MpyDevice(self, ip_str, info_data)
+                await device.initialize()
+                self.poll_plan(device).slow_done(time.monotonic())
+                self._store_snapshot(device)
+            self.devices.append(device)
+            for add_device in self._device_listeners:
+                add_device(device)
 
-            except Exception as err_msg:  # noqa: BLE001
-                self.logger.info(f"Error searching for ELWA devices: {err_msg}")  # noqa: G004
+        except Exception as err_msg:  # noqa: BLE001
+            self.logger.info(f"Error searching for ELWA devices: {err_msg}")  # noqa: G004
+            self._retry_hosts.add(ip_str)
+
+    @property
+    def initializing(self) -> bool:
+        """Return True while hosts are still being initialized."""
+        return any(not task.done() for task in self._init_tasks)
+
+    @callback
+    def _retry_failed_hosts(self) -> None:
+        """Initialize hosts again that were not reachable so far."""
+        retry, self._retry_hosts = self._retry_hosts, set()
+        for ip_str in retry:
+            task = self.hass.async_create_background_task(
+                self._async_init_host(ip_str), f"mypv-init-{ip_str}"
+            )
+            self._init_tasks.add(task)
+            task.add_done_callback(self._init_tasks.discard)
+
+    @callback
+    def async_add_device_listener(
+        self, add_device: Callable[[MpyDevice], None]
+    ) -> None:
+        """Call add_device for all devices now and for late ones when ready."""
+        for device in self.devices:
+            add_device(device)
+        self._device_listeners.append(add_device)
 
     async def _async_update_data(self) -> None:
         """Update status of all ELWA devices."""
 
-        for mpv_dev in self.devices:
-            await mpv_dev.update()
+        start = time.monotonic()
+        self._retry_failed_hosts()
+        for scheduler in self.schedulers.values():
+            scheduler.depth_peak = 0
+        await asyncio.gather(
+            *(self._async_update_device(mpv_dev) for mpv_dev in self.devices)
+        )
+        now = time.monotonic()
+        self.logger.debug(
+            "Polled %s myPV devices in %.3f s", len(self.devices), now - start
+        )
+        if FORCED_REFRESH_INTERVAL and now >= self._next_forced_refresh:
+            self._next_forced_refresh = now + FORCED_REFRESH_INTERVAL
+            self._changed = None
+        else:
+            self._changed = {
+                dev.serial_number: dev.changed_keys for dev in self.devices
+            }
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Notify only listeners depending on keys changed in the last cycle."""
+        changed = self._changed
+        self._changed = None
+        suppressed = 0
+        for update_callback, context in list(self._listeners.values()):
+            if changed is not None and context is not None:
+                serial, keys = context
+                dev_changed = changed.get(serial, ())
+                if "*" not in dev_changed and keys.isdisjoint(dev_changed):
+                    suppressed += 1
+                    continue
+            update_callback()
+        if suppressed:
+            self.suppressed_writes += suppressed
+            self.logger.debug(
+                "Suppressed %s unchanged entity updates, %s in total",
+                suppressed,
+                self.suppressed_writes,
+            )
+
+    @callback
+    def async_notify_keys(self, device, keys: set[str]) -> None:
+        """Notify the listeners of keys changed outside of a poll cycle."""
+        if keys:
+            self._changed = {device.serial_number: set(keys)}
+            self.async_update_listeners()
+
+    @callback
+    def rebind(self, device, ip: str) -> None:
+        """Move a device to a new address, its entities stay in place."""
+        old_ip = device.ip
+        self.logger.info(f"{device.name} moved from {old_ip} to {ip}")  # noqa: G004
+        device.set_ip(ip)
+        if old_ip in self.request_stats:
+            self.request_stats[ip] = self.request_stats.pop(old_ip)
+        self.schedulers.pop(old_ip, None)
+        # Poll the new address with the next cycle
+        self._health[device.serial_number] = DeviceHealth()
+        self.poll_plan(device).snap()
+        self.poll_plan(device).request_slow()
+        # Another device may still hold ip until it is found elsewhere
+        hosts = list(self.hosts)
+        if old_ip in hosts:
+            hosts[hosts.index(old_ip)] = ip
+        self.hosts = hosts
+        if device.serial_number in self._snapshots:
+            self._store_snapshot(device)
+        entry = self.config_entry
+        data = {**entry.data, CONF_HOSTS: self.hosts}
+        if data.get(DEV_IP) == old_ip:
+            data[DEV_IP] = ip
+        if entry.unique_id == f"mypv_{old_ip}":
+            self.hass.config_entries.async_update_entry(
+                entry, data=data, unique_id=f"mypv_{ip}"
+            )
+        else:
+            self.hass.config_entries.async_update_entry(entry, data=data)
+
+    @callback
+    def displace(self, device) -> None:
+        """Stop polling a device whose address another unit took over.
+
+        Breaker probes check the serial, so the device stays unavailable
+        until discovery finds it at its new address.
+        """
+        health = self.health(device)
+        if health.state == HEALTH_OPEN:
+            return
+        self.logger.warning(
+            "Another device answers at %s, %s is unavailable until found again",
+            device.ip,
+            device.name,
+        )
+        health.trip(time.monotonic())
+        device.digests.clear()
+        self.async_notify_keys(device, {"*"})
+
+    @callback
+    def _store_snapshot(self, device) -> None:
+        """Remember the capabilities of a device, saved delayed."""
+        self._snapshots[device.serial_number] = device.snapshot()
+        self._snapshot_store.async_delay_save(
+            lambda: {"devices": self._snapshots}, SNAPSHOT_SAVE_DELAY
+        )
+
+    async def _async_revalidate_snapshot(self, device) -> None:
+        """Reload once the live capabilities differ from the stored snapshot.
+
+        A key reported null for a while must not recreate all entities, the
+        change has to persist for CAPABILITY_CONFIRMATIONS slow ticks.
+        Control found unsupported is probed again first, it may have failed
+        only once when the snapshot was taken.
+        """
+        if not device.control_enabled:
+            device.control_enabled = True
+            if await self.state_update(device) is not False:
+                device.control_supported = True
+        old = self._snapshots.get(device.serial_number)
+        if old is None or capabilities(old) == capabilities(device.snapshot()):
+            device.revalidate = False
+            self._capability_changes.pop(device.serial_number, None)
+            self._store_snapshot(device)
+            return
+        changes = self._capability_changes.get(device.serial_number, 0) + 1
+        self._capability_changes[device.serial_number] = changes
+        if changes >= CAPABILITY_CONFIRMATIONS:
+            device.revalidate = False
+            self._capability_changes.pop(device.serial_number)
+            self._store_snapshot(device)
+            self.logger.info(
+                f"Capabilities of {device.name} changed, reloading entities"  # noqa: G004
+            )
+            self.hass.config_entries.async_schedule_reload(self.config_entry.entry_id)
+
+    def energy_accumulator(self, device, key: str) -> EnergyAccumulator:
+        """Return the energy accumulator of a power key, from storage if saved."""
+        stored = self._energy.get(device.serial_number, {}).get(key)
+        if isinstance(stored, EnergyAccumulator):
+            return stored
+        if stored is None:
+            acc = EnergyAccumulator(ENERGY_MAX_GAP)
+        else:
+            acc = EnergyAccumulator.from_dict(stored, ENERGY_MAX_GAP)
+        self._energy.setdefault(device.serial_number, {})[key] = acc
+        return acc
+
+    @callback
+    def _integrate_energy(self, device) -> None:
+        """Integrate the polled power of a device, notify changed energies."""
+        if not device.energy or not isinstance(device.data, dict):
+            return
+        timestamp = sample_time(device.data, time.time())
+        now = dt_util.now()
+        changed = False
+        for key, acc in device.energy.items():
+            if acc.add_sample(device.data.get(key), timestamp, now):
+                device.changed_keys.add(f"energy:{key}")
+                changed = True
+        if changed:
+            self.async_save_energy()
+
+    @callback
+    def async_save_energy(self) -> None:
+        """Save all energy accumulators delayed."""
+        if not self._energy_save_pending:
+            # Every call of async_delay_save would restart the delay
+            self._energy_save_pending = True
+            self._energy_store.async_delay_save(self._energy_data, ENERGY_SAVE_DELAY)
+
+    @callback
+    def _energy_data(self) -> dict[str, Any]:
+        """Return the energy accumulators for storage."""
+        self._energy_save_pending = False
+        return {
+            "devices": {
+                serial: {
+                    key: acc.as_dict() if isinstance(acc, EnergyAccumulator) else acc
+                    for key, acc in keys.items()
+                }
+                for serial, keys in self._energy.items()
+            }
+        }
+
+    def poll_plan(self, device) -> PollPlan:
+        """Return the poll plan of a device."""
+        if device.serial_number not in self._poll_plans:
+            self._poll_plans[device.serial_number] = PollPlan(
+                SETUP_POLL_INTERVAL,
+                self.update_interval.total_seconds(),
+                self.config_entry.options.get(ADAPTIVE_POLLING, False),
+            )
+        return self._poll_plans[device.serial_number]
 
-    async def do_get_request(self, url: str) -> str:
-        """Perform asyncio get request."""
-        timeout = aiohttp.ClientTimeout(total=5)
-        async with (
-            aiohttp.ClientSession(timeout=timeout) as session,
-            session.get(url) as resp,
-        ):
-            return await resp.text()
+    def health(self, device) -> DeviceHealth:
+        """Return the circuit breaker of a device."""
+        if device.serial_number not in self._health:
+            self._health[device.serial_number] = DeviceHealth()
+        return self._health[device.serial_number]
+
+    async def _async_update_device(self, device) -> None:
+        """Update one device, never let its failure affect the others."""
+        plan = self.poll_plan(device)
+        health = self.health(device)
+        now = time.monotonic()
+        device.changed_keys = set()
+        if health.state == HEALTH_OPEN:
+            if not health.probe_due(now):
+                return
+            # Cheap probe before a full poll
+            health.state = HEALTH_HALF_OPEN
+            info = await self.check_ip(device.ip)
+            if not info or info.get("sn") != device.serial_number:
+                health.record_failure(now)
+                self.logger.debug(
+                    "%s still unreachable, next probe in %s s",
+                    device.name,
+                    health.backoff,
+                )
+                return
+        elif not plan.poll_due(now):
+            return
+        slow = plan.slow_due(now)
+        async with self._poll_limit:
+            try:
+                success = await device.update(slow)
+                self.stats(device.ip).last_cycle = time.monotonic() - now
+                if not success:
+                    if health.record_failure(now):
+                        self.logger.warning(f"{device.name} is unreachable")  # noqa: G004
+                        device.changed_keys = {"*"}
+                    return
+                if not device.live:
+                    device.live = True
+                    device.changed_keys.add("*")
+                self._integrate_energy(device)
+                if health.record_success():
+                    self.logger.info(f"{device.name} is reachable again")  # noqa: G004
+                    device.changed_keys.add("*")
+                    device.control_enabled = device.control_supported
+                elif slow and device.control_supported:
+                    # Retry control.html after a failed read
+                    device.control_enabled = True
+                if slow:
+                    plan.slow_done(now)
+                plan.poll_done(
+                    now, not device.changed_keys.isdisjoint(ADAPTIVE_ACTIVITY_KEYS)
+                )
+                # mypv_dev.jsn may format the version differently than data.jsn
+                if "data:fwversion" in device.changed_keys:
+                    plan.info_due = True
+                if plan.info_due and (info := await self.info_update(device)):
+                    device.set_info(info)
+                    plan.info_due = False
+                if slow and device.revalidate:
+                    await self._async_revalidate_snapshot(device)
+                elif device.serial_fallback and not self._snapshots.get(
+                    device.serial_number, {}
+                ).get("serialize"):
+                    # Remember the fallback, parallel polls fail again otherwise
+                    self._store_snapshot(device)
+            except Exception as err_msg:  # noqa: BLE001
+                self.logger.warning(f"Error updating {device.name}: {err_msg}")  # noqa: G004
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared keep-alive session, create it if needed."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit_per_host=HTTP_LIMIT_PER_HOST,
+                keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT),
+            )
+        return self._session
+
+    async def async_start_capture(self, path: str) -> None:
+        """Record all requests and responses to a capture file."""
+        await self.async_stop_capture()
+        self.recorder = CaptureRecorder(self.hass, path)
+        self.logger.info("Capturing myPV requests to %s", path)
+
+    async def async_stop_capture(self) -> None:
+        """Stop recording, write all pending records."""
+        if self.recorder is not None:
+            recorder, self.recorder = self.recorder, None
+            await recorder.async_stop()
+            self.logger.info(
+                "Captured %s myPV requests to %s", recorder.records, recorder.path
+            )
+
+    async def async_close(self) -> None:
+        """Close the shared session and its pooled connections."""
+        for task in self._init_tasks:
+            task.cancel()
+        self._device_listeners.clear()
+        if self._energy_save_pending:
+            await self._energy_store.async_save(self._energy_data())
+        await self.async_stop_capture()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def scheduler(self, host: str) -> RequestScheduler:
+        """Return the request scheduler of a device host."""
+        if host not in self.schedulers:
+            self.schedulers[host] = RequestScheduler(HTTP_LIMIT_PER_HOST)
+        return self.schedulers[host]
+
+    def stats(self, host: str) -> DeviceStats:
+        """Return the request statistics of a device host."""
+        if host not in self.request_stats:
+            self.request_stats[host] = DeviceStats()
+        return self.request_stats[host]
+
+    async def do_get_request(self, url: str, priority: int = PRIORITY_POLL) -> str:
+        """Perform asyncio get request through the device's scheduler."""
+        parts = urlsplit(url)
+        stats = self.stats(parts.netloc)
+        endpoint = parts.path.lstrip("/")
+        async with self.scheduler(parts.netloc).slot(priority):
+            start = time.monotonic()
+            try:
+                if self.transport is not None:
+                    response_text = await self.transport.get(url)
+                else:
+                    async with self._get_session().get(url) as resp:
+                        response_text = await resp.text()
+            except TimeoutError:
+                stats.record_error(endpoint, timeout=True)
+                if self.recorder is not None:
+                    self.recorder.record(
+                        url, time.monotonic() - start, error=ERROR_TIMEOUT
+                    )
+                raise
+            except Exception:
+                stats.record_error(endpoint)
+                if self.recorder is not None:
+                    self.recorder.record(
+                        url, time.monotonic() - start, error=ERROR_CLIENT
+                    )
+                raise
+        latency = time.monotonic() - start
+        stats.record_request(endpoint, latency, len(response_text))
+        if self.recorder is not None:
+            self.recorder.record(url, latency, response_text)
+        return response_text
 
     async def check_ip(self, ip):
         """Update inverter info."""
@@ -128,12 +899,25 @@ class MypvCommunicator(DataUpdateCoordinator):
         except Exception:  # noqa: BLE001
             return False
 
+    def _unchanged(self, device, endpoint: str, response_text: str) -> bool:
+        """Return True if response equals the last one, refresh timestamp."""
+        device.last_seen[endpoint] = time.monotonic()
+        return device.digests.get(endpoint) == hash(response_text)
+
     async def data_update(self, device):
         """Update inverter data info."""
         try:
             url = f"http://{device.ip}/data.jsn"
             response_text = await self.do_get_request(url)
-            return json.loads(response_text)
+            if self._unchanged(device, "data", response_text):
+                return None
+            resp = json.loads(response_text)
+            device.digests["data"] = hash(response_text)
+            return resp
+        except json.JSONDecodeError as err_msg:
+            self.stats(device.ip).record_parse_error("data.jsn")
+            self.logger.info(f"Invalid data response: {err_msg}")  # noqa: G004
+            return False
         except Exception as err_msg:  # noqa: BLE001
             self.logger.info(f"Error during data update: {err_msg}")  # noqa: G004
             return False
@@ -143,7 +927,15 @@ class MypvCommunicator(DataUpdateCoordinator):
         try:
             url = f"http://{device.ip}/setup.jsn"
             response_text = await self.do_get_request(url)
-            return json.loads(response_text)
+            if self._unchanged(device, "setup", response_text):
+                return None
+            resp = json.loads(response_text)
+            device.digests["setup"] = hash(response_text)
+            return resp
+        except json.JSONDecodeError as err_msg:
+            self.stats(device.ip).record_parse_error("setup.jsn")
+            self.logger.info(f"Invalid setup response: {err_msg}")  # noqa: G004
+            return False
         except Exception as err_msg:  # noqa: BLE001
             self.logger.info(f"Error during setup update: {err_msg}")  # noqa: G004
             return False
@@ -154,7 +946,10 @@ class MypvCommunicator(DataUpdateCoordinator):
             try:
                 url = f"http://{device.ip}/control.html?"
                 response_text = await self.do_get_request(url)
+                if self._unchanged(device, "state", response_text):
+                    return None
                 self.get_state_dict(response_text, device)
+                device.digests["state"] = hash(response_text)
             except Exception as err_msg:  # noqa: BLE001
                 self.logger.warning(f"Error during control update: {err_msg}")  # noqa: G004
                 device.control_enabled = False
@@ -163,23 +958,33 @@ class MypvCommunicator(DataUpdateCoordinator):
                 return True
         return False
 
-    async def set_number(self, device, key, act_val: int):
-        """Set heating temperature."""
+    async def set_setup(self, device, values: dict[str, Any]) -> bool:
+        """Write several setup values with a single setup.jsn request."""
+        if not values:
+            return True
         try:
-            url = f"http://{device.ip}/setup.jsn?{key}={act_val}"
-            response_text = await self.do_get_request(url)
-            self.get_state_dict(response_text, device)
-            return True  # noqa: TRY300
+            url = f"http://{device.ip}/setup.jsn?{urlencode(values)}"
+            response_text = await self.do_get_request(url, PRIORITY_COMMAND)
+            self.poll_plan(device).snap()
+            self.poll_plan(device).request_slow()
+            self._apply_setup(device, response_text, values)
         except Exception as err_msg:  # noqa: BLE001
-            self.logger.warning(f"Error during set power command: {err_msg}")  # noqa: G004
+            self.logger.warning(f"Error during setup command: {err_msg}")  # noqa: G004
             return False
+        else:
+            return True
+
+    async def set_number(self, device, key, act_val: int):
+        """Set heating temperature."""
+        return await self.set_setup(device, {key: act_val})
 
     async def set_power(self, device, act_pow: int):
         """Set heater power."""
         try:
             url = f"http://{device.ip}/control.html?power={act_pow}"
-            response_text = await self.do_get_request(url)
-            self.get_state_dict(response_text, device)
+            response_text = await self.do_get_request(url, PRIORITY_COMMAND)
+            self.poll_plan(device).snap()
+            self._apply_state(device, response_text)
             return True  # noqa: TRY300
         except Exception as err_msg:  # noqa: BLE001
             self.logger.warning(f"Error during set power command: {err_msg}")  # noqa: G004
@@ -187,21 +992,15 @@ class MypvCommunicator(DataUpdateCoordinator):
 
     async def set_control_mode(self, device, act_mode: int):
         """Set power control mode, e.g. html."""
-        try:
-            url = f"http://{device.ip}/setup.jsn?ctrl={act_mode}"
-            response_text = await self.do_get_request(url)  # noqa: F841
-            # self.get_state_dict(response_text, device)
-            return True  # noqa: TRY300
-        except Exception as err_msg:  # noqa: BLE001
-            self.logger.warning(f"Error during set control mode command: {err_msg}")  # noqa: G004
-            return False
+        return await self.set_setup(device, {"ctrl": act_mode})
 
     async def set_pid_power(self, device, act_pow: int):
         """Set heater power with local pid control."""
         try:
             url = f"http://{device.ip}/control.html?pid_power={act_pow}"
-            response_text = await self.do_get_request(url)
-            self.get_state_dict(response_text, device)
+            response_text = await self.do_get_request(url, PRIORITY_COMMAND)
+            self.poll_plan(device).snap()
+            self._apply_state(device, response_text)
         except Exception as err_msg:  # noqa: BLE001
             self.logger.warning(f"Error during set pid power command: {err_msg}")  # noqa: G004
             return False
@@ -209,22 +1008,19 @@ class MypvCommunicator(DataUpdateCoordinator):
             return True
 
     async def switch(self, device, key, state: bool):
-        """Set heater power with local pid control."""
-        try:
-            url = f"http://{device.ip}/setup.jsn?{key}={int(state)}"
-            response_text = await self.do_get_request(url)
-            self.get_state_dict(response_text, device)
-        except Exception as err_msg:  # noqa: BLE001
-            self.logger.warning(f"Error during boost command: {err_msg}")  # noqa: G004
-            return False
-        else:
-            return True
+        """Switch a setup flag on or off."""
+        return await self.set_setup(device, {key: int(state)})
 
     async def activate_boost(self, device, mode: int = 1):
         """Set heater power with local pid control."""
         try:
             url = f"http://{device.ip}/data.jsn?bststrt={mode}"
-            await self.do_get_request(url)
+            await self.do_get_request(url, PRIORITY_COMMAND)
+            self.poll_plan(device).snap()
+            if isinstance(device.data, dict) and "boostactive" in device.data:
+                device.data = {**device.data, "boostactive": int(mode == 1)}
+                device.digests.pop("data", None)
+                self.async_notify_keys(device, {"data:boostactive"})
         except Exception as err_msg:  # noqa: BLE001
             self.logger.warning(f"Error during boost command: {err_msg}")  # noqa: G004
             return False
@@ -233,11 +1029,38 @@ class MypvCommunicator(DataUpdateCoordinator):
 
     def get_state_dict(self, text: str, device) -> None:
         """Convert lines to state dict."""
+        device.digests.pop("state", None)
+        # Parse completely before swapping in, no torn updates on failure
+        device.state_dict = {**device.state_dict, **parse_state_text(text)}
+
+    def _apply_state(self, device, response_text: str) -> None:
+        """Take the control state acknowledged by a command."""
+        old_state = dict(device.state_dict)
+        self.get_state_dict(response_text, device)
+        self.async_notify_keys(
+            device, changed_keys("state", old_state, device.state_dict)
+        )
+
+    def _apply_setup(self, device, response_text: str, values: dict) -> None:
+        """Update cached setup optimistically after an acknowledged write.
 
-        text = text.replace("\r\n", "<br>").replace("\n", "<br>")
-        resp_lines = text.split("<br>")
-        for line in resp_lines:
-            if len(line) > 4 and not line.startswith("<"):
-                parts = line.split("=")
-                if len(parts) >= 2:
-                    device.state_dict[parts[0]] = parts[1].split()[0].replace(",", "")
+        The digest is dropped, so the next slow poll reconciles the cache
+        with the setup the device really stores.
+        """
+        old_setup = device.setup if isinstance(device.setup, dict) else {}
+        try:
+            echo = json.loads(response_text)
+        except ValueError:
+            echo = None
+            self.get_state_dict(response_text, device)
+        if isinstance(echo, dict):
+            # Device echoed its setup, trust it over the written values
+            device.setup = {**old_setup, **values, **echo}
+        else:
+            device.setup = {**old_setup, **values}
+        device.digests.pop("setup", None)
+        self.async_notify_keys(
+            device,
+            changed_keys("setup", old_setup, device.setup)
+            | {f"setup:{key}" for key in values},
+        )
@@ -1,28 +1,44 @@
 """Config flow for ELWA myPV integration."""
 # import logging
 
-import json
-from json import JSONDecodeError
+import asyncio
+from ipaddress import IPv4Address
 from typing import Any
 
-import requests
-from requests.exceptions import ConnectTimeout, HTTPError
 import voluptuous as vol
 
 from homeassistant import config_entries
-from homeassistant.components import dhcp
+from homeassistant.components import dhcp, network
 from homeassistant.core import HomeAssistant, callback
 
 from .const import (
+    ADAPTIVE_POLLING,
     CONF_DEFAULT_INTERVAL,
+    CONF_DEFAULT_PARALLEL,
+    CONF_DEFAULT_WRITE_DELAY,
     CONF_HOSTS,
     CONF_MAX_INTERVAL,
+    CONF_MAX_PARALLEL,
+    CONF_MAX_WRITE_DELAY,
     CONF_MIN_INTERVAL,
     DEV_IP,
     DOMAIN,
+    MAX_IP,
+    MIN_IP,
+    PARALLEL_POLLS,
+    SCAN_RANGE,
+    SCAN_TIMEOUT,
+    SERIAL_REQUESTS,
     UPDATE_INTERVAL,
+    WRITE_DELAY,
+)
+from .discovery import (
+    async_discover_mypv_devices,
+    async_probe_device,
+    async_rebind_device,
+    async_scan_range,
+    scan_range_hosts,
 )
-from .discovery import async_discover_mypv_devices
 
 
 @callback
@@ -56,28 +72,21 @@ class MpvConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         self._discovered_devices: dict[str, str] = {}
         self._discovery_ip: str | None = None
         self._discovery_name: str | None = None
+        self._scan_hosts: list[str] = []
+        self._scan_task: asyncio.Task | None = None
+        # Devices found by the running range scan, shown while it runs
+        self._scan_found: list[str] = []
 
     def _all_hosts_in_configuration_exist(self, ip_list) -> bool:
         """Return True if all hosts found already exist in configuration."""
         return all(ip in mypv_entries(self.hass) for ip in ip_list)
 
-    def _check_host(self, dev_ip: str) -> tuple[bool, list[str], str]:
+    async def _async_check_host(self, dev_ip: str) -> tuple[bool, list[str], str]:
         """Check if connect to myPV device with given ip address works and fetch name."""
-        host_list: list[str] = []
-        device_name = "myPV"
-
-        try:
-            # Attempt to fetch device JSON
-            response = requests.get(f"http://{dev_ip}/mypv_dev.jsn", timeout=0.5)
-            data = json.loads(response.text)
-            host_list.append(dev_ip)
-            if isinstance(data, dict) and "device" in data:
-                device_name = str(data["device"])
-
-        except ConnectTimeout, HTTPError, TypeError, JSONDecodeError:
-            pass
-
-        return len(host_list) > 0, host_list, device_name
+        info = await async_probe_device(self.hass, dev_ip, SCAN_TIMEOUT)
+        if info is None:
+            return False, [], "myPV"
+        return True, [dev_ip], str(info.get("device", "myPV"))
 
     async def async_step_dhcp(
         self, discovery_info: dhcp.DhcpServiceInfo
@@ -85,13 +94,15 @@ class MpvConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         """Handle discovery via dhcp."""
         dev_ip = discovery_info.ip
 
-        can_connect, ips_found, fetched_name = await self.hass.async_add_executor_job(
-            self._check_host, dev_ip
-        )
-
-        if not can_connect:
+        info = await async_probe_device(self.hass, dev_ip)
+        if info is None:
             return self.async_abort(reason="cannot_connect")
 
+        # A configured device with a new lease is followed, not offered
+        if async_rebind_device(self.hass, dev_ip, info):
+            return self.async_abort(reason="already_configured")
+        fetched_name = str(info.get("device", "myPV"))
+
         await self.async_set_unique_id(f"mypv_{dev_ip}")
         self._abort_if_unique_id_configured()
 
@@ -108,9 +119,7 @@ class MpvConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         dev_ip = discovery_info["ip"]
         dev_host = discovery_info.get("host", "myPV")
 
-        can_connect, ips_found, fetched_name = await self.hass.async_add_executor_job(
-            self._check_host, dev_ip
-        )
+        can_connect, _, fetched_name = await self._async_check_host(dev_ip)
         if not can_connect:
             return self.async_abort(reason="cannot_connect")
 
@@ -133,9 +142,7 @@ class MpvConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         if user_input is not None:
             update_interval = CONF_DEFAULT_INTERVAL
 
-            can_connect, ips_found, _ = await self.hass.async_add_executor_job(
-                self._check_host, self._discovery_ip
-            )
+            can_connect, ips_found, _ = await self._async_check_host(self._discovery_ip)
 
             if can_connect:
                 final_title = (
@@ -172,13 +179,16 @@ class MpvConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
         if not self._discovered_devices and user_input is None:
             # Perform network scan if no devices are known yet
-            devices = await async_discover_mypv_devices()
+            devices = await async_discover_mypv_devices(self.hass)
             for device in devices:
                 if device["ip"] not in self._discovered_devices:
                     self._discovered_devices[device["ip"]] = device.get("host", "myPV")
 
+        if user_input is not None and user_input.get(SCAN_RANGE):
+            return await self.async_step_scan()
+
         if user_input is not None:
-            dev_ip = user_input[DEV_IP]
+            dev_ip = user_input.get(DEV_IP, "")
             update_interval = user_input[UPDATE_INTERVAL]
 
             if not (isinstance(update_interval, int)):
@@ -194,10 +204,7 @@ class MpvConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 can_connect,
                 ips_found,
                 fetched_name,
-            ) = await self.hass.async_add_executor_job(
-                self._check_host,
-                dev_ip,
-            )
+            ) = await self._async_check_host(dev_ip)
 
             if can_connect and not self._errors:
                 if self._all_hosts_in_configuration_exist(ips_found):
@@ -252,7 +259,7 @@ class MpvConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 else:
                     setup_schema = vol.Schema(
                         {
-                            vol.Required(DEV_IP): str,
+                            vol.Optional(DEV_IP): str,
                             vol.Required(
                                 UPDATE_INTERVAL, default=default_interval
                             ): int,
@@ -261,25 +268,93 @@ class MpvConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             else:
                 setup_schema = vol.Schema(
                     {
-                        vol.Required(DEV_IP): str,
+                        vol.Optional(DEV_IP): str,
                         vol.Required(UPDATE_INTERVAL, default=default_interval): int,
                     }
                 )
         else:
             setup_schema = vol.Schema(
                 {
-                    vol.Required(DEV_IP, default=user_input.get(DEV_IP, "")): str,
+                    vol.Optional(DEV_IP, default=user_input.get(DEV_IP, "")): str,
                     vol.Required(
                         UPDATE_INTERVAL,
                         default=user_input.get(UPDATE_INTERVAL, CONF_DEFAULT_INTERVAL),
                     ): int,
                 }
             )
+        # Probe an ip range where UDP broadcasts do not pass
+        setup_schema = setup_schema.extend(
+            {vol.Optional(SCAN_RANGE, default=False): bool}
+        )
 
         return self.async_show_form(
             step_id="user", data_schema=setup_schema, errors=self._errors
         )
 
+    async def async_step_scan(self, user_input=None) -> config_entries.ConfigFlowResult:
+        """Ask for the ip range to scan for myPV devices."""
+        errors = {}
+        if user_input is not None and MIN_IP in user_input:
+            try:
+                self._scan_hosts = scan_range_hosts(
+                    user_input[MIN_IP], user_input[MAX_IP]
+                )
+            except ValueError:
+                errors[MAX_IP] = "invalid_range"
+            else:
+                return await self.async_step_scan_progress()
+            first, last = user_input[MIN_IP], user_input[MAX_IP]
+        else:
+            # Default to the /24 network of Home Assistant
+            own_ip = IPv4Address(await network.async_get_source_ip(self.hass))
+            net = int(own_ip) & 0xFFFFFF00
+            first, last = str(IPv4Address(net + 1)), str(IPv4Address(net + 254))
+
+        return self.async_show_form(
+            step_id="scan",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(MIN_IP, default=first): str,
+                    vol.Required(MAX_IP, default=last): str,
+                }
+            ),
+            errors=errors,
+        )
+
+    async def async_step_scan_progress(
+        self, user_input=None
+    ) -> config_entries.ConfigFlowResult:
+        """Scan the ip range, found devices go to the selection list."""
+        if self._scan_task is None:
+            self._scan_found = []
+
+            def found(ip: str, info: dict[str, Any]) -> None:
+                name = str(info.get("device", "myPV"))
+                self._discovered_devices[ip] = name
+                self._scan_found.append(f"{name} ({ip})")
+                # Show the step again, the frontend reloads changed placeholders
+                self.hass.async_create_task(
+                    self.hass.config_entries.flow.async_configure(self.flow_id)
+                )
+
+            self._scan_task = self.hass.async_create_task(
+                async_scan_range(
+                    self.hass, self._scan_hosts, found, self.async_update_progress
+                )
+            )
+        if not self._scan_task.done():
+            return self.async_show_progress(
+                step_id="scan_progress",
+                progress_action="scan_range",
+                progress_task=self._scan_task,
+                description_placeholders={
+                    "hosts": str(len(self._scan_hosts)),
+                    "found": ", ".join(self._scan_found) or "-",
+                },
+            )
+        self._scan_task = None
+        return self.async_show_progress_done(next_step_id="user")
+
 
 class MpvOptionsFlow(config_entries.OptionsFlow):
     """Allow to change options of integration while running."""
@@ -307,9 +382,24 @@ class MpvOptionsFlow(config_entries.OptionsFlow):
             elif update_interval > CONF_MAX_INTERVAL:
                 self._errors[UPDATE_INTERVAL] = "interval_too_long"
 
+            parallel_polls = user_input.get(PARALLEL_POLLS, CONF_DEFAULT_PARALLEL)
+            if not 1 <= parallel_polls <= CONF_MAX_PARALLEL:
+                self._errors[PARALLEL_POLLS] = "invalid_parallel"
+
+            write_delay = user_input.get(WRITE_DELAY, CONF_DEFAULT_WRITE_DELAY)
+            if not 0 <= write_delay <= CONF_MAX_WRITE_DELAY:
+                self._errors[WRITE_DELAY] = "invalid_write_delay"
+
             if not self._errors:
                 return self.async_create_entry(
-                    title="", data={UPDATE_INTERVAL: update_interval}
+                    title="",
+                    data={
+                        UPDATE_INTERVAL: update_interval,
+                        PARALLEL_POLLS: parallel_polls,
+                        SERIAL_REQUESTS: user_input.get(SERIAL_REQUESTS, False),
+                        WRITE_DELAY: write_delay,
+                        ADAPTIVE_POLLING: user_input.get(ADAPTIVE_POLLING, False),
+                    },
                 )
 
         # Retrieve current interval from options or data
@@ -328,6 +418,26 @@ class MpvOptionsFlow(config_entries.OptionsFlow):
         opt_schema = vol.Schema(
             {
                 vol.Required(UPDATE_INTERVAL, default=current_interval): int,
+                vol.Required(
+                    PARALLEL_POLLS,
+                    default=self.config_entry.options.get(
+                        PARALLEL_POLLS, CONF_DEFAULT_PARALLEL
+                    ),
+                ): int,
+                vol.Required(
+                    SERIAL_REQUESTS,
+                    default=self.config_entry.options.get(SERIAL_REQUESTS, False),
+                ): bool,
+                vol.Required(
+                    WRITE_DELAY,
+                    default=self.config_entry.options.get(
+                        WRITE_DELAY, CONF_DEFAULT_WRITE_DELAY
+                    ),
+                ): int,
+                vol.Required(
+                    ADAPTIVE_POLLING,
+                    default=self.config_entry.options.get(ADAPTIVE_POLLING, False),
+                ): bool,
             }
         )
 
@@ -1,12 +1,18 @@
 """Constants for the myPV integration."""
 
+from dataclasses import dataclass
+
+from homeassistant.components.sensor import SensorDeviceClass
 from homeassistant.const import (
+    PERCENTAGE,
+    EntityCategory,
     UnitOfElectricCurrent,
     UnitOfElectricPotential,
     UnitOfEnergy,
     UnitOfFrequency,
     UnitOfPower,
     UnitOfTemperature,
+    UnitOfTime,
 )
 
 DOMAIN = "mypv"
@@ -22,6 +28,59 @@ UPDATE_INTERVAL = "update_interval"
 CONF_DEFAULT_INTERVAL = 10
 CONF_MIN_INTERVAL = 3
 CONF_MAX_INTERVAL = 30
+PARALLEL_POLLS = "parallel_polls"
+CONF_DEFAULT_PARALLEL = 4
+CONF_MAX_PARALLEL = 32
+SERIAL_REQUESTS = "serial_requests"
+# Partly failed parallel polls in a row before a device is queried serially
+PARALLEL_FAILURE_LIMIT = 3
+WRITE_DELAY = "write_delay"
+CONF_DEFAULT_WRITE_DELAY = 500
+CONF_MAX_WRITE_DELAY = 5000
+SETUP_POLL_INTERVAL = 60
+FORCED_REFRESH_INTERVAL = 600
+BREAKER_THRESHOLD = 3
+BREAKER_MIN_BACKOFF = 10
+BREAKER_MAX_BACKOFF = 600
+ADAPTIVE_POLLING = "adaptive_polling"
+ADAPTIVE_MAX_INTERVAL = 300
+ADAPTIVE_BACKOFF = 1.5
+DISCOVERY_INTERVAL = 300
+STARTUP_BUDGET = 15
+SNAPSHOT_VERSION = 1
+SNAPSHOT_SAVE_DELAY = 10
+# Slow ticks in a row a capability change must be seen on before reload
+CAPABILITY_CONFIRMATIONS = 3
+ENERGY_VERSION = 1
+ENERGY_SAVE_DELAY = 60
+# Longer poll gaps than this, e.g. while unreachable, are not integrated
+ENERGY_MAX_GAP = 600
+PROBE_TIMEOUT = 2
+SCAN_RANGE = "scan_range"
+SCAN_PARALLEL = 64
+SCAN_TIMEOUT = 1
+MAX_SCAN_HOSTS = 1024
+
+# Changed device keys that keep an adaptively polled device on fast cadence
+ADAPTIVE_ACTIVITY_KEYS = frozenset(
+    {
+        "data:power",
+        "data:power_elwa2",
+        "data:power_ac9",
+        "data:power_ac9s",
+        "data:power_act",
+        "data:surplus",
+        "data:status",
+        "data:ctrlstate",
+        "state:State",
+        "state:Power",
+    }
+)
+
+HTTP_TIMEOUT = 5
+# data.jsn, setup.jsn and control.html of a device in parallel
+HTTP_LIMIT_PER_HOST = 3
+HTTP_KEEPALIVE_TIMEOUT = 15
 
 SENSOR_TYPES = {
     "device": ["Device", None, "text"],
@@ -209,3 +268,129 @@ SETUP_TYPES = {
     "ww1boost": ["Boost Min Temperature", None, "number"],
     "ctrl": ["Control type", None, "ctrl_type"],
 }
+STATS_TYPES = {
+    "latency_p50": ["Request latency p50", UnitOfTime.MILLISECONDS, "stats"],
+    "latency_p95": ["Request latency p95", UnitOfTime.MILLISECONDS, "stats"],
+    "error_rate": ["Request error rate", PERCENTAGE, "stats"],
+    "cycle_time": ["Last poll cycle time", UnitOfTime.MILLISECONDS, "stats"],
+    "queue_depth": ["Peak request queue depth", None, "stats"],
+    "queue_wait_avg": ["Request queue wait avg", UnitOfTime.MILLISECONDS, "stats"],
+    "queue_wait_max": ["Request queue wait max", UnitOfTime.MILLISECONDS, "stats"],
+    "superseded_writes": ["Superseded writes", None, "stats"],
+}
+
+# Data keys never turned into entities
+IGNORED_DATA_KEYS = frozenset(
+    {
+        "device",
+        "fwversionlatest",
+        "psversionlatest",
+        "p9sversionlatest",
+        "fsetup",
+        "date",
+        "loctime",
+        "unixtime",
+        "wifi_list",
+        "freq",
+    }
+)
+DEVICE_TYPES = {
+    "control_state": ["Control state", None, "sensor"],
+}
+
+# Raw values are divided by the scale of their unit
+UNIT_SCALES = {
+    UnitOfFrequency.HERTZ: 1000,
+    UnitOfTemperature.CELSIUS: 10,
+    UnitOfElectricCurrent.AMPERE: 10,
+}
+UNIT_DEVICE_CLASSES = {
+    UnitOfTemperature.CELSIUS: SensorDeviceClass.TEMPERATURE,
+    UnitOfElectricCurrent.AMPERE: SensorDeviceClass.CURRENT,
+    UnitOfElectricPotential.VOLT: SensorDeviceClass.VOLTAGE,
+    UnitOfPower.WATT: SensorDeviceClass.POWER,
+    UnitOfEnergy.KILO_WATT_HOUR: SensorDeviceClass.ENERGY,
+    UnitOfFrequency.HERTZ: SensorDeviceClass.FREQUENCY,
+}
+
+
+@dataclass(frozen=True, slots=True)
+class EntityDescriptor:
+    """Precompiled description of one key of SENSOR_, SETUP_ or STATS_TYPES."""
+
+    key: str
+    name: str
+    unit: str | None
+    kind: str
+    order: int
+    scale: int = 1
+    device_class: SensorDeviceClass | None = None
+    icon: str | None = None
+    category: EntityCategory | None = None
+    enabled_default: bool = True
+
+
+def _icon(key: str, name: str, kind: str) -> str | None:
+    """Return the icon of a key, None for the platform default."""
+    if kind == "stats":
+        if key == "error_rate":
+            return "mdi:lan-disconnect"
+        if key in ["queue_depth", "superseded_writes"]:
+            return "mdi:counter"
+        return "mdi:timer-outline"
+    if name in ["IP", "DNS", "Gateway", "Subnet mask"]:
+        return "mdi:ip-network"
+    if name.split()[-1] == "Version":
+        return "mdi:numeric"
+    if name.split()[-1] == "Surplus":
+        return "mdi:octagram-plus-outline"
+    if name in ["Screen mode", "Power supply state"]:
+        return "mdi:state-machine"
+    if name in ["Fan speed"]:
+        return "mdi:fan"
+    return None
+
+
+def compile_descriptors(types: dict[str, list]) -> dict[str, EntityDescriptor]:
+    """Compile a types table into descriptors, keeping the table order."""
+    descriptors = {}
+    for order, (key, (name, unit, kind)) in enumerate(types.items()):
+        if kind == "stats":
+            device_class = (
+                SensorDeviceClass.DURATION if unit == UnitOfTime.MILLISECONDS else None
+            )
+            category = EntityCategory.DIAGNOSTIC
+            enabled = False
+        else:
+            device_class = UNIT_DEVICE_CLASSES.get(unit, SensorDeviceClass.ENUM)
+            diagnostic = key.split("_")[0] in ["power1", "power2", "power3"]
+            category = EntityCategory.DIAGNOSTIC if diagnostic else None
+            enabled = not diagnostic  # Entity will initally be disabled
+        descriptors[key] = EntityDescriptor(
+            key=key,
+            name=name,
+            unit=unit,
+            kind=kind,
+            order=order,
+            scale=UNIT_SCALES.get(unit, 1),
+            device_class=device_class,
+            icon=_icon(key, name, kind),
+            category=category,
+            enabled_default=enabled,
+        )
+    return descriptors
+
+
+def keys_by_kind(descriptors: dict[str, EntityDescriptor]) -> dict[str, frozenset]:
+    """Return the keys of descriptors grouped by kind."""
+    kinds: dict[str, set[str]] = {}
+    for desc in descriptors.values():
+        kinds.setdefault(desc.kind, set()).add(desc.key)
+    return {kind: frozenset(keys) for kind, keys in kinds.items()}
+
+
+SENSOR_DESCRIPTORS = compile_descriptors(SENSOR_TYPES)
+SETUP_DESCRIPTORS = compile_descriptors(SETUP_TYPES)
+STATS_DESCRIPTORS = compile_descriptors(STATS_TYPES)
+DEVICE_DESCRIPTORS = compile_descriptors(DEVICE_TYPES)
+SENSOR_KINDS = keys_by_kind(SENSOR_DESCRIPTORS)
@@ -1,14 +1,31 @@
 """UDP Discovery for myPV devices."""
 
 import asyncio
+from collections.abc import Callable
+from functools import partial
+from ipaddress import IPv4Address, ip_network
+import json
 import logging
 import socket
 import struct
 from typing import Any
 
+import aiohttp
+
+from homeassistant.components import network
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from .communicate import loaded_communicators
+from .const import MAX_SCAN_HOSTS, PROBE_TIMEOUT, SCAN_PARALLEL, SCAN_TIMEOUT
+
 _LOGGER = logging.getLogger(__name__)
 
 DISCOVERY_PORT = 16124
+LIMITED_BROADCAST = "255.255.255.255"
+DISCOVERY_TIMEOUT = 3.0
+DISCOVERY_QUIET = 0.5
+DISCOVERY_RETRY_DELAY = 0.25
 
 
 def calc_modbus_crc16(data: bytes) -> int:
@@ -69,22 +86,32 @@ DISCOVERY_MESSAGES = [
 class UDPDiscoveryProtocol(asyncio.DatagramProtocol):
     """Protocol to discover myPV devices via UDP."""
 
-    def __init__(self) -> None:
+    def __init__(self, log_level: int = logging.INFO) -> None:
         """Initialize the protocol and prepare to store found devices."""
-        self.found_devices: list[dict[str, Any]] = []
+        self.log_level = log_level
+        self.found_devices: dict[str, dict[str, Any]] = {}
         self.transport: asyncio.DatagramTransport | None = None
+        self.new_device = asyncio.Event()
 
     def connection_made(self, transport: asyncio.BaseTransport) -> None:
-        """Set up the transport and send discovery messages."""
+        """Set up the transport for broadcasts."""
         self.transport = transport  # type: ignore  # noqa: PGH003
         sock = transport.get_extra_info("socket")
         if sock:
             sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
 
-        if self.transport:
-            _LOGGER.debug("Sending UDP broadcast to discover myPV devices")
+    def broadcast(self, targets: list[str]) -> None:
+        """Send the discovery messages to all broadcast addresses."""
+        if self.transport is None:
+            return
+        _LOGGER.debug("Sending UDP broadcast to %s to discover myPV devices", targets)
+        for target in targets:
             for msg in DISCOVERY_MESSAGES:
-                self.transport.sendto(msg, ("255.255.255.255", DISCOVERY_PORT))
+                try:
+                    self.transport.sendto(msg, (target, DISCOVERY_PORT))
+                except OSError as ex:
+                    _LOGGER.debug("Cannot broadcast to %s: %s", target, ex)
+                    break
 
     def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:
         """Handle incoming UDP responses from devices."""
@@ -97,30 +124,165 @@ class UDPDiscoveryProtocol(asyncio.DatagramProtocol):
             device_name = DEVICE_MODELS.get(device_id, "myPV Device")
             real_ip = socket.inet_ntoa(data[4:8])
 
-            if not any(d.get("ip") == real_ip for d in self.found_devices):
-                _LOGGER.info("Discovered %s at %s", device_name, real_ip)
-                self.found_devices.append({"ip": real_ip, "host": device_name})
+            if real_ip not in self.found_devices:
+                _LOGGER.log(self.log_level, "Discovered %s at %s", device_name, real_ip)
+                self.found_devices[real_ip] = {"ip": real_ip, "host": device_name}
+                self.new_device.set()
+
+
+async def async_broadcast_addresses(hass: HomeAssistant | None) -> list[str]:
+    """Return the directed broadcast addresses of all enabled interfaces."""
+    targets: dict[str, None] = {}
+    if hass is not None:
+        for adapter in await network.async_get_adapters(hass):
+            if not adapter["enabled"]:
+                continue
+            for ipv4 in adapter["ipv4"]:
+                net = ip_network(
+                    f"{ipv4['address']}/{ipv4['network_prefix']}", strict=False
+                )
+                if not net.is_loopback and net.prefixlen < 32:
+                    targets[str(net.broadcast_address)] = None
+    # Limited broadcast as before covers hosts without network settings
+    targets[LIMITED_BROADCAST] = None
+    return list(targets)
 
 
-async def async_discover_mypv_devices() -> list[dict[str, Any]]:
-    """Fire UDP broadcast and return discovered devices."""
-    _LOGGER.info("Starting myPV UDP discovery process")
+async def async_discover_mypv_devices(
+    hass: HomeAssistant | None = None,
+    timeout: float = DISCOVERY_TIMEOUT,
+    periodic: bool = False,
+) -> list[dict[str, Any]]:
+    """Fire UDP broadcasts and return discovered devices.
+
+    Broadcasts are repeated with growing delay to cover lost packets. The
+    scan ends after timeout or, once a device answered, when no new device
+    answered for DISCOVERY_QUIET seconds. Periodic scans log at
+    debug level only.
+    """
+    log_level = logging.DEBUG if periodic else logging.INFO
+    _LOGGER.log(log_level, "Starting myPV UDP discovery process")
     loop = asyncio.get_running_loop()
 
     try:
+        targets = await async_broadcast_addresses(hass)
         transport, protocol = await loop.create_datagram_endpoint(
-            UDPDiscoveryProtocol,
+            partial(UDPDiscoveryProtocol, log_level),
             local_addr=("0.0.0.0", DISCOVERY_PORT),
             allow_broadcast=True,
         )
-        # Give devices a bit more time to answer
-        await asyncio.sleep(3)
-        transport.close()
+        try:
+            start = loop.time()
+            deadline = start + timeout
+            last_new = start
+            retry_delay = DISCOVERY_RETRY_DELAY
+            next_send = start
+            while (now := loop.time()) < deadline:
+                if next_send is not None and now >= next_send:
+                    protocol.broadcast(targets)
+                    next_send = now + retry_delay
+                    retry_delay *= 2
+                    if next_send > deadline:
+                        next_send = None
+                if protocol.new_device.is_set():
+                    protocol.new_device.clear()
+                    last_new = now
+                if protocol.found_devices and now - last_new >= DISCOVERY_QUIET:
+                    break
+                wake = deadline
+                if protocol.found_devices:
+                    wake = min(wake, last_new + DISCOVERY_QUIET)
+                if next_send is not None:
+                    wake = min(wake, next_send)
+                try:
+                    await asyncio.wait_for(
+                        protocol.new_device.wait(), max(wake - now, 0.01)
+                    )
+                except TimeoutError:
+                    pass
+        finally:
+            transport.close()
 
         if not protocol.found_devices:
-            _LOGGER.warning("The myPV discovery finished but no devices responded")
+            # Sites without broadcast to the devices would warn every interval
+            _LOGGER.log(
+                logging.DEBUG if periodic else logging.WARNING,
+                "The myPV discovery finished but no devices responded",
+            )
 
-        return protocol.found_devices  # noqa: TRY300
+        return list(protocol.found_devices.values())  # noqa: TRY300
     except Exception as ex:  # noqa: BLE001
         _LOGGER.error("Error during myPV UDP discovery: %s", ex)
         return []
+
+
+async def async_probe_device(
+    hass: HomeAssistant, ip: str, timeout: float = PROBE_TIMEOUT
+) -> dict[str, Any] | None:
+    """Return the device info of the myPV device at ip, None if none answers."""
+    try:
+        async with async_get_clientsession(hass).get(
+            f"http://{ip}/mypv_dev.jsn",
+            timeout=aiohttp.ClientTimeout(total=timeout),
+        ) as resp:
+            info = json.loads(await resp.text())
+    except (aiohttp.ClientError, TimeoutError, OSError, ValueError):
+        return None
+    if isinstance(info, dict) and "sn" in info:
+        return info
+    return None
+
+
+@callback
+def async_rebind_device(hass: HomeAssistant, ip: str, info: dict[str, Any]) -> bool:
+    """Follow a configured device to ip, return False if it is unknown.
+
+    Another configured device still bound to ip lost its lease to this one,
+    it is displaced until found at its new address.
+    """
+    known = False
+    for comm in loaded_communicators(hass):
+        for device in comm.devices:
+            if device.serial_number == info["sn"]:
+                if device.ip != ip:
+                    comm.rebind(device, ip)
+                known = True
+            elif device.ip == ip:
+                comm.displace(device)
+    return known
+
+
+def scan_range_hosts(first: str, last: str) -> list[str]:
+    """Return all addresses from first to last, raise ValueError if invalid."""
+    start, end = int(IPv4Address(first)), int(IPv4Address(last))
+    if not 0 <= end - start < MAX_SCAN_HOSTS:
+        raise ValueError(f"Range {first} - {last} is empty or too large")
+    return [str(IPv4Address(addr)) for addr in range(start, end + 1)]
+
+
+async def async_scan_range(
+    hass: HomeAssistant,
+    hosts: list[str],
+    found: Callable[[str, dict[str, Any]], None],
+    progress: Callable[[float], None] | None = None,
+) -> None:
+    """Probe mypv_dev.jsn on all hosts in parallel, report devices as found.
+
+    For networks where UDP broadcasts do not pass, e.g. between VLANs.
+    """
+    limit = asyncio.Semaphore(SCAN_PARALLEL)
+    done = 0
+    step = max(1, len(hosts) // 20)  # report progress in 5 % steps
+
+    async def probe(ip: str) -> None:
+        nonlocal done
+        async with limit:
+            info = await async_probe_device(hass, ip, SCAN_TIMEOUT)
+        if info is not None:
+            _LOGGER.info("Found %s at %s", info.get("device", "myPV"), ip)
+            found(ip, info)
+        done += 1
+        if progress is not None and done % step == 0:
+            progress(done / len(hosts))
+
+    await asyncio.gather(*(probe(ip) for ip in hosts))
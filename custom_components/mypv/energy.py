@@ -0,0 +1,108 @@
+"""Energy integration of polled myPV power values."""
+
+from datetime import datetime
+from typing import Any
+
+PERIOD_TOTAL = "total"
+PERIOD_DAILY = "daily"
+PERIOD_MONTHLY = "monthly"
+PERIODS = (PERIOD_TOTAL, PERIOD_DAILY, PERIOD_MONTHLY)
+
+# W * s per kWh
+WS_PER_KWH = 3_600_000
+
+
+def sample_time(data: dict[str, Any], now: float) -> float:
+    """Return the device time of a data response, now if it has none."""
+    try:
+        return float(data["unixtime"])
+    except (KeyError, TypeError, ValueError):
+        return now
+
+
+class EnergyAccumulator:
+    """Trapezoidal energy integration of one power key.
+
+    One accumulator feeds the total, daily and monthly energy of the key,
+    values are in kWh.
+    """
+
+    def __init__(self, max_gap: float) -> None:
+        """Initialize empty, gaps over max_gap s are not integrated."""
+        self.max_gap = max_gap
+        self.values: dict[str, float] = dict.fromkeys(PERIODS, 0.0)
+        self.last_reset: dict[str, str | None] = dict.fromkeys(PERIODS)
+        # Without stored state the entities seed it from their last state
+        self.stored = False
+        self._last_time: float | None = None
+        self._last_power: float | None = None
+
+    def add_sample(self, power, timestamp: float, now: datetime) -> bool:
+        """Integrate a power sample in W, return True if an energy changed."""
+        changed = self._roll_over(now)
+        try:
+            power = float(power)
+        except (TypeError, ValueError):
+            return changed
+        last_time, last_power = self._last_time, self._last_power
+        if last_time is not None and timestamp <= last_time:
+            # Same response again or device clock set back
+            if timestamp < last_time:
+                self._last_time, self._last_power = timestamp, power
+            return changed
+        self._last_time, self._last_power = timestamp, power
+        if last_time is None or timestamp - last_time > self.max_gap:
+            return changed
+        energy = (last_power + power) / 2 * (timestamp - last_time) / WS_PER_KWH
+        if not energy:
+            return changed
+        for period in PERIODS:
+            self.values[period] += energy
+        return True
+
+    def _roll_over(self, now: datetime) -> bool:
+        """Reset the daily and monthly energy when a new period began."""
+        changed = False
+        day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        month = day.replace(day=1)
+        for period, start in ((PERIOD_DAILY, day), (PERIOD_MONTHLY, month)):
+            last_reset = self.last_reset[period]
+            if last_reset is None or datetime.fromisoformat(last_reset) < start:
+                self.values[period] = 0.0
+                self.last_reset[period] = start.isoformat()
+                changed = True
+        return changed
+
+    def reset(self, period: str, now: datetime) -> None:
+        """Reset the energy of one period to zero."""
+        self.values[period] = 0.0
+        self.last_reset[period] = now.isoformat()
+
+    def restore(self, period: str, value: float, since: str | None) -> None:
+        """Take the value of a period from a restored sensor state.
+
+        since is the last reset or, for daily and monthly values, the time
+        the value was valid, an outdated value is reset with the next sample.
+        """
+        self.values[period] = value
+        self.last_reset[period] = since
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the state for storage."""
+        return {
+            "values": self.values,
+            "last_reset": self.last_reset,
+            "last_time": self._last_time,
+            "last_power": self._last_power,
+        }
+
+    @classmethod
+    def from_dict(cls, stored: dict[str, Any], max_gap: float) -> "EnergyAccumulator":
+        """Return an accumulator from stored state."""
+        acc = cls(max_gap)
+        acc.values.update(stored["values"])
+        acc.last_reset.update(stored["last_reset"])
+        acc.stored = True
+        acc._last_time = stored["last_time"]
+        acc._last_power = stored["last_power"]
+        return acc
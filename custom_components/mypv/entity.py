@@ -0,0 +1,19 @@
+"""Base entity of myPV integration."""
+
+from typing import TYPE_CHECKING
+
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+if TYPE_CHECKING:
+    from .communicate import MypvCommunicator
+
+    CoordinatorEntity = CoordinatorEntity[MypvCommunicator]
+
+
+class MpvEntity(CoordinatorEntity):
+    """Coordinator entity of one myPV device."""
+
+    @property
+    def available(self) -> bool:
+        """Return True if the device is reachable."""
+        return super().available and self.device.available
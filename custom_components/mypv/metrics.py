@@ -0,0 +1,83 @@
+"""Request statistics of myPV devices."""
+
+from collections import deque
+
+STATS_WINDOW = 100
+
+
+def percentile(samples, fraction: float) -> float | None:
+    """Return the nearest-rank percentile of samples, None if empty."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class EndpointStats:
+    """Latency and error counters of one device endpoint."""
+
+    def __init__(self) -> None:
+        """Initialize empty statistics."""
+        self.latencies: deque[float] = deque(maxlen=STATS_WINDOW)
+        self.requests = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.parse_errors = 0
+        self.last_size = 0
+
+
+class DeviceStats:
+    """Request statistics of one device."""
+
+    def __init__(self) -> None:
+        """Initialize empty statistics."""
+        self.endpoints: dict[str, EndpointStats] = {}
+        # True for failed requests of the last STATS_WINDOW requests
+        self.outcomes: deque[bool] = deque(maxlen=STATS_WINDOW)
+        self.latencies: deque[float] = deque(maxlen=STATS_WINDOW)
+        self.last_cycle: float | None = None
+
+    def endpoint(self, name: str) -> EndpointStats:
+        """Return the statistics of one endpoint."""
+        if name not in self.endpoints:
+            self.endpoints[name] = EndpointStats()
+        return self.endpoints[name]
+
+    def record_request(self, name: str, latency: float, size: int) -> None:
+        """Record a successful request."""
+        stats = self.endpoint(name)
+        stats.requests += 1
+        stats.latencies.append(latency)
+        stats.last_size = size
+        self.latencies.append(latency)
+        self.outcomes.append(False)
+
+    def record_error(self, name: str, timeout: bool = False) -> None:
+        """Record a failed request."""
+        stats = self.endpoint(name)
+        stats.requests += 1
+        stats.errors += 1
+        if timeout:
+            stats.timeouts += 1
+        self.outcomes.append(True)
+
+    def record_parse_error(self, name: str) -> None:
+        """Record a response that could not be parsed."""
+        self.endpoint(name).parse_errors += 1
+
+    @property
+    def latency_p50(self) -> float | None:
+        """Return the median request latency in seconds."""
+        return percentile(self.latencies, 0.5)
+
+    @property
+    def latency_p95(self) -> float | None:
+        """Return the 95th percentile of request latency in seconds."""
+        return percentile(self.latencies, 0.95)
+
+    @property
+    def error_rate(self) -> float | None:
+        """Return the share of failed requests, 0..1."""
+        if not self.outcomes:
+            return None
+        return sum(self.outcomes) / len(self.outcomes)
@@ -1,8 +1,9 @@
 """myPV integration."""
 
+import asyncio
+from dataclasses import replace
 import logging
-
-import pytz
+from typing import Any
 
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers import device_registry as dr
@@ -10,7 +11,18 @@ from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .binary_sensor import MpvBin1Sensor, MpvBin2Sensor, MpvBin3Sensor, MpvBinSensor
 from .button import MpvBoostButton, MpvBoostOffButton
-from .const import DOMAIN, SENSOR_TYPES, SETUP_TYPES
+from .const import (
+    DEVICE_DESCRIPTORS,
+    DOMAIN,
+    IGNORED_DATA_KEYS,
+    PARALLEL_FAILURE_LIMIT,
+    SENSOR_DESCRIPTORS,
+    SENSOR_KINDS,
+    SERIAL_REQUESTS,
+    SETUP_DESCRIPTORS,
+    STATS_DESCRIPTORS,
+)
+from .energy import EnergyAccumulator
 from .number import MpvPidPowerControl, MpvPowerControl, MpvSetupControl, MpvToutControl
 from .select import MpvCtrlTypeSelect
 from .sensor import (
@@ -20,6 +32,7 @@ from .sensor import (
     MpvEnergySensor,
     MpvOutStatSensor,
     MpvSensor,
+    MpvStatsSensor,
     MpvUpdateSensor,
 )
 from .switch import MpvHttpSwitch, MpvSetupSwitch
@@ -27,6 +40,15 @@ from .switch import MpvHttpSwitch, MpvSetupSwitch
 _LOGGER = logging.getLogger(__name__)
 
 
+def changed_keys(source: str, old, new) -> set[str]:
+    """Return the keys of new that differ from old, tagged by source."""
+    if not isinstance(old, dict):
+        return {f"{source}:{key}" for key in new}
+    changed = {f"{source}:{key}" for key, val in new.items() if old.get(key) != val}
+    changed.update(f"{source}:{key}" for key in old.keys() - new.keys())
+    return changed
+
+
 class MpyDevice(CoordinatorEntity):
     """Class definition of an myPV device."""
 
@@ -45,9 +67,8 @@ class MpyDevice(CoordinatorEntity):
         self.serial_number = info["sn"]
         self.fw = info["fwversion"]
         self.model = info["device"]
-        if "acthor9s" in info:
-            if info["acthor9s"] == 2:
-                self.model += " 9s"
+        if info.get("acthor9s") == 2:
+            self.model += " 9s"
         self._name = f"{self.model} {self._id}"
         self.state = 0
         self.setup = []
@@ -65,12 +86,63 @@ class MpyDevice(CoordinatorEntity):
         self.pid_power_set = 0
         self.logger = _LOGGER
         self.control_enabled = True
-        self.energy_sensors = []
+        self.control_supported = True
+        # Energy accumulators per power key, integrated by the communicator
+        self.energy: dict[str, EnergyAccumulator] = {}
+        self.changed_keys: set[str] = set()
+        # Hash of the last raw response and time of last response per endpoint
+        self.digests: dict[str, int] = {}
+        self.last_seen: dict[str, float] = {}
+        # Some firmware cannot serve parallel connections, the option forces
+        # serial requests for all devices, the fallback is found per device
+        self._serial_option = self._entry.options.get(SERIAL_REQUESTS, False)
+        self.serial_fallback = False
+        self._parallel_failures = 0
+        # False until the device answered, e.g. when created from a snapshot
+        self.live = False
+        # Compare capabilities with the stored snapshot after the next poll
+        self.revalidate = False
 
     async def initialize(self):
         """Get setup information, find sensors."""
         self.setup = await self.comm.setup_update(self)
         self.data = await self.comm.data_update(self)
+        self._register_device()
+        await self.comm.state_update(self)
+        self.control_supported = self.control_enabled
+        # Probe control.html again, a single failure must not stick
+        self.revalidate = not self.control_supported
+        self.live = True
+        await self.init_entities()
+
+    async def initialize_from_snapshot(self, snapshot: dict[str, Any]) -> None:
+        """Find sensors from a stored capability snapshot, without requests."""
+        self.data = dict(snapshot["data"])
+        self.setup = dict(snapshot["setup"])
+        # Stored False is probed again by the revalidation
+        self.control_supported = self.control_enabled = snapshot["control"]
+        self.serial_fallback = snapshot.get("serialize", False)
+        self._register_device()
+        self.revalidate = True
+        await self.init_entities()
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return the capabilities entities are created from."""
+        return {
+            "host": self.ip,
+            "info": self._info,
+            "data": {
+                key: val
+                for key, val in self.data.items()
+                if val is not None and val != "null"
+            },
+            "setup": dict(self.setup),
+            "control": self.control_supported,
+            "serialize": self.serial_fallback,
+        }
+
+    def _register_device(self) -> None:
+        """Create or update the device registry entry."""
         dr.async_get(self._hass).async_get_or_create(
             config_entry_id=self._entry.entry_id,
             identifiers={(DOMAIN, self.serial_number)},
@@ -80,14 +152,39 @@ class MpyDevice(CoordinatorEntity):
             sw_version=self.fw,
             hw_version=self.serial_number,
         )
-        await self.comm.state_update(self)
-        await self.init_entities()
+
+    def listen_context(self, *keys: str) -> tuple[str, frozenset[str]]:
+        """Return coordinator context for an entity depending on keys."""
+        return (self.serial_number, frozenset(keys))
 
     @property
     def unique_id(self):
         """Return unique id based on device serial."""
         return self.serial_number
 
+    @property
+    def available(self) -> bool:
+        """Return True if the device is reachable."""
+        return self.live and self.comm.health(self).available
+
+    @property
+    def serialize_requests(self) -> bool:
+        """Return True if endpoints are queried one after another."""
+        return self._serial_option or self.serial_fallback
+
+    def _check_parallel(self, results: list) -> None:
+        """Fall back to serial requests if parallel polls keep failing partly."""
+        failed = sum(result is False for result in results)
+        if not 0 < failed < len(results):
+            self._parallel_failures = 0
+            return
+        self._parallel_failures += 1
+        if self._parallel_failures >= PARALLEL_FAILURE_LIMIT:
+            self.serial_fallback = True
+            self.logger.info(
+                f"{self.name} fails parallel requests, querying endpoints one after another"  # noqa: G004
+            )
+
     @property
     def name(self):
         """Return the name of the device."""
@@ -100,180 +197,141 @@ class MpyDevice(CoordinatorEntity):
 
     async def init_entities(self):
         """Take sensors from data and init HA sensors."""
-
-        def remove_data_key(key):
-            """Safely remove key from data_keys."""
-            if key in data_keys:
-                data_keys.remove(key)
-
-        ha_timezone_str = self.comm.hass.config.time_zone
-        tz = await self.comm.hass.async_add_executor_job(pytz.timezone, ha_timezone_str)
-        data_keys = list(self.data.keys())  # type: ignore  # noqa: PGH003
-        defined_data_keys = list(SENSOR_TYPES.keys())  # type: ignore  # noqa: PGH003
-        setup_keys = list(self.setup.keys())  # type: ignore  # noqa: PGH003
-        defined_setup_keys = list(SETUP_TYPES.keys())
-        remove_data_key("device")
-        remove_data_key("device")
-        remove_data_key("fwversionlatest")
-        remove_data_key("psversionlatest")
-        remove_data_key("p9sversionlatest")
-        remove_data_key("fsetup")
-        remove_data_key("date")
-        remove_data_key("loctime")
-        remove_data_key("unixtime")
-        remove_data_key("wifi_list")
-        remove_data_key("freq")
+        # use only keys included in data with valid values
+        data_keys = {
+            key
+            for key, value in self.data.items()  # type: ignore  # noqa: PGH003
+            if value is not None and value != "null"
+        }
+        data_keys = (data_keys - IGNORED_DATA_KEYS) & SENSOR_DESCRIPTORS.keys()
+        # Sensor value might not be available at startup
+        data_keys |= SENSOR_KINDS["sensor_always"]
         if self.model != "Solthor":
             self.sensors.append(
                 MpvDevStatSensor(
-                    self, "control_state", ["Control state", None, "sensor"]
+                    self, "control_state", DEVICE_DESCRIPTORS["control_state"]
                 )
             )
-        for key in defined_data_keys:
-            # use only keys included in data with valid values
-            if (
-                SENSOR_TYPES[key][2]
-                in [
-                    "binary_sensor",
-                    "sensor",
-                    "version",
-                    "ip_string",
-                    "upd_stat",
-                    "dev_stat",
-                    "button",
-                    "switch",
-                    "control",
-                    "text",
-                ]
-                and key in data_keys
-                and self.data[key] is not None  # type: ignore  # noqa: PGH003
-                and self.data[key] != "null"  # type: ignore  # noqa: PGH003
-            ):
-                self.logger.info(f"Sensor Key: {key}: {self.data[key]}")  # type: ignore  # noqa: G004, PGH003
-                if SENSOR_TYPES[key][2] in ["sensor", "text", "ip_string", "version"]:
-                    self.sensors.append(MpvSensor(self, key, SENSOR_TYPES[key]))
-                elif SENSOR_TYPES[key][2] in ["dev_stat"]:
-                    self.sensors.append(MpvDevStatSensor(self, key, SENSOR_TYPES[key]))
-                elif SENSOR_TYPES[key][2] in ["upd_stat"]:
-                    self.sensors.append(MpvUpdateSensor(self, key, SENSOR_TYPES[key]))
-                elif SENSOR_TYPES[key][2] in ["binary_sensor"]:
-                    if self.model == "AC-THOR 9s" and SENSOR_TYPES[key][0] == "Relais":
-                        sensor_type: list[str] = SENSOR_TYPES[key]
-                        self.binary_sensors.append(
-                            MpvBin1Sensor(self, key, sensor_type)
-                        )
-                        sensor_type[0] = "Out 3"
-                        self.binary_sensors.append(
-                            MpvBin2Sensor(self, key, sensor_type)
-                        )
-                        sensor_type[0] = "Out 2"
-                        self.binary_sensors.append(
-                            MpvBin3Sensor(self, key, sensor_type)
-                        )
-                        sensor_type[0] = "Output status"
-                        self.sensors.append(MpvOutStatSensor(self, key, sensor_type))
-                    else:
-                        self.binary_sensors.append(
-                            MpvBinSensor(self, key, SENSOR_TYPES[key])
-                        )
-                elif SENSOR_TYPES[key][2] in ["button"] and self.control_enabled:
-                    self.buttons.append(MpvBoostButton(self, key, SENSOR_TYPES[key]))
+        for desc in sorted(
+            (SENSOR_DESCRIPTORS[key] for key in data_keys), key=lambda desc: desc.order
+        ):
+            key = desc.key
+            self.logger.info(f"Sensor Key: {key}: {self.data.get(key)}")  # type: ignore  # noqa: G004, PGH003
+            match desc.kind:
+                case "sensor" | "text" | "ip_string" | "version" | "sensor_always":
+                    self.sensors.append(MpvSensor(self, key, desc))
+                case "dev_stat":
+                    self.sensors.append(MpvDevStatSensor(self, key, desc))
+                case "upd_stat":
+                    self.sensors.append(MpvUpdateSensor(self, key, desc))
+                case "binary_sensor" if (
+                    self.model == "AC-THOR 9s" and desc.name == "Relais"
+                ):
+                    self.binary_sensors.append(MpvBin1Sensor(self, key, desc))
+                    self.binary_sensors.append(
+                        MpvBin2Sensor(self, key, replace(desc, name="Out 3"))
+                    )
+                    self.binary_sensors.append(
+                        MpvBin3Sensor(self, key, replace(desc, name="Out 2"))
+                    )
+                    self.sensors.append(
+                        MpvOutStatSensor(self, key, replace(desc, name="Output status"))
+                    )
+                case "binary_sensor":
+                    self.binary_sensors.append(MpvBinSensor(self, key, desc))
+                case "button" if self.control_enabled:
+                    self.buttons.append(MpvBoostButton(self, key, desc))
                     self.buttons.append(
-                        MpvBoostOffButton(self, key + "off", SENSOR_TYPES[key + "off"])
+                        MpvBoostOffButton(
+                            self, key + "off", SENSOR_DESCRIPTORS[key + "off"]
+                        )
                     )
-                elif SENSOR_TYPES[key][2] in ["control"]:
+                case "control":
                     if self.control_enabled:
-                        self.controls.append(
-                            MpvPowerControl(self, key, SENSOR_TYPES[key])
-                        )
-                        self.controls.append(
-                            MpvPidPowerControl(self, key, SENSOR_TYPES[key])
-                        )
+                        self.controls.append(MpvPowerControl(self, key, desc))
+                        self.controls.append(MpvPidPowerControl(self, key, desc))
                     # Setup as sensor, too
-                    self.sensors.append(
-                        MpvSensor(self, key, SENSOR_TYPES[key])
-                    )  # power
-                    self.sensors.append(
-                        MpvEnergySensor(
-                            self,
-                            f"int_{key}",
-                            SENSOR_TYPES[f"int_{key}"],
-                            SENSOR_TYPES[key],
-                            tz,
-                        )
-                    )  # energy
-                    self.energy_sensors.append(self.sensors[-1])
-                    self.sensors.append(
-                        MpvEnergyMonthlySensor(
-                            self,
-                            f"intm_{key}",
-                            SENSOR_TYPES[f"intm_{key}"],
-                            SENSOR_TYPES[key],
-                            tz,
-                        )
-                    )  # energy daily
-                    self.energy_sensors.append(self.sensors[-1])
-                    self.sensors.append(
-                        MpvEnergyDailySensor(
-                            self,
-                            f"intd_{key}",
-                            SENSOR_TYPES[f"intd_{key}"],
-                            SENSOR_TYPES[key],
-                            tz,
+                    self.sensors.append(MpvSensor(self, key, desc))  # power
+                    self.energy[key] = self.comm.energy_accumulator(self, key)
+                    for prefix, sensor_class in (
+                        ("int_", MpvEnergySensor),  # energy
+                        ("intm_", MpvEnergyMonthlySensor),  # energy monthly
+                        ("intd_", MpvEnergyDailySensor),  # energy daily
+                    ):
+                        energy_desc = SENSOR_DESCRIPTORS[prefix + key]
+                        self.sensors.append(
+                            sensor_class(self, energy_desc.key, energy_desc, key)
                         )
-                    )  # energy daily
-                    self.energy_sensors.append(self.sensors[-1])
-            if SENSOR_TYPES[key][2] in ["sensor_always"]:
-                # Sensor value might not be available at statrtup
-                self.sensors.append(MpvSensor(self, key, SENSOR_TYPES[key]))
-        for key in defined_setup_keys:
-            # use only keys included in setup with valid values
-            if (
-                SETUP_TYPES[key][2]
-                in [
-                    "binary_sensor",
-                    "button",
-                    "ctrl_type",
-                    "number",
-                    "sensor",
-                    "switch",
-                    "control",
-                ]
-                and key in setup_keys
-                and self.setup[key] is not None  # type: ignore  # noqa: PGH003
-                and self.setup[key] != "null"  # type: ignore  # noqa: PGH003
-            ):
-                self.logger.info(f"Setup Key: {key}: {self.setup[key]}")  # type: ignore  # noqa: G004, PGH003
-                if SETUP_TYPES[key][2] in ["sensor", "text", "ip_string"]:
-                    self.sensors.append(MpvSensor(self, key, SETUP_TYPES[key]))
-                elif SETUP_TYPES[key][2] in ["ctrl_type"]:
+        setup_keys = {
+            key
+            for key, value in self.setup.items()  # type: ignore  # noqa: PGH003
+            if value is not None and value != "null"
+        } & SETUP_DESCRIPTORS.keys()
+        for desc in sorted(
+            (SETUP_DESCRIPTORS[key] for key in setup_keys), key=lambda desc: desc.order
+        ):
+            key = desc.key
+            self.logger.info(f"Setup Key: {key}: {self.setup[key]}")  # type: ignore  # noqa: G004, PGH003
+            match desc.kind:
+                case "sensor" | "text" | "ip_string":
+                    self.sensors.append(MpvSensor(self, key, desc))
+                case "ctrl_type":
                     self.logger.info(f"Creating select entity for {key}")  # type: ignore  # noqa: G004
-                    self.selects.append(MpvCtrlTypeSelect(self, key, SETUP_TYPES[key]))
-                elif SETUP_TYPES[key][2] in ["binary_sensor"]:
-                    self.binary_sensors.append(
-                        MpvBinSensor(self, key, SETUP_TYPES[key])
-                    )
-                elif SETUP_TYPES[key][2] in ["switch"]:
-                    self.switches.append(MpvSetupSwitch(self, key, SETUP_TYPES[key]))
-                elif SETUP_TYPES[key][2] in ["number"]:
-                    self.controls.append(MpvSetupControl(self, key, SETUP_TYPES[key]))
+                    self.selects.append(MpvCtrlTypeSelect(self, key, desc))
+                case "binary_sensor":
+                    self.binary_sensors.append(MpvBinSensor(self, key, desc))
+                case "switch":
+                    self.switches.append(MpvSetupSwitch(self, key, desc))
+                case "number":
+                    self.controls.append(MpvSetupControl(self, key, desc))
         if self.model != "Solthor":
             self.switches.append(MpvHttpSwitch(self, "ctrl"))
             self.controls.append(MpvToutControl(self, "tout"))
+        for key, desc in STATS_DESCRIPTORS.items():
+            self.sensors.append(MpvStatsSensor(self, key, desc))
+
+    def set_ip(self, ip: str) -> None:
+        """Take a new address, e.g. after a DHCP lease change."""
+        self._ip = ip
+        self.digests.clear()
+
+    def set_info(self, info) -> None:
+        """Take new device info, e.g. after a firmware update."""
+        self._info = info
+        self.fw = info["fwversion"]
+        self.revalidate = True
+        devreg = dr.async_get(self._hass)
+        if dev := devreg.async_get_device(identifiers={(DOMAIN, self.serial_number)}):
+            devreg.async_update_device(dev.id, sw_version=self.fw)
+
+    async def update(self, slow: bool = True) -> bool:
+        """Update all sensors, setup.jsn only if slow tier is due.
 
-    async def update(self):
-        """Update all sensors."""
-        for en_sensor in self.energy_sensors:
-            await en_sensor.async_update()  # type: ignore  # noqa: PGH003
-        resp = await self.comm.data_update(self)
-        if resp:
-            self.data = resp
-        resp = await self.comm.setup_update(self)
-        if resp:
-            self.setup = resp
+        Return False if the device did not answer the data request.
+        """
+        old_state = dict(self.state_dict)
+        changed: set[str] = set()
+        requests = [self.comm.data_update(self)]
         if self.control_enabled:
-            if await self.comm.state_update(self):
-                if "State" in self.state_dict:
-                    self.state = int(self.state_dict["State"])
-                else:
-                    self.state = -1
+            requests.append(self.comm.state_update(self))
+        if slow:
+            requests.append(self.comm.setup_update(self))
+        if self.serialize_requests:
+            results = [await request for request in requests]
+        else:
+            results = await asyncio.gather(*requests)
+            self._check_parallel(results)
+        if results[0]:
+            changed |= changed_keys("data", self.data, results[0])
+            self.data = results[0]
+        if slow and results[-1]:
+            changed |= changed_keys("setup", self.setup, results[-1])
+            self.setup = results[-1]
+        if self.control_enabled and results[1]:
+            if "State" in self.state_dict:
+                self.state = int(self.state_dict["State"])
+            else:
+                self.state = -1
+            changed |= changed_keys("state", old_state, self.state_dict)
+        self.changed_keys = changed
+        return results[0] is not False
@@ -1,14 +1,15 @@
 """Numbers of myPV integration."""
 
 import asyncio
+from functools import partial
 import logging
 
 from homeassistant.components.number import NumberDeviceClass, NumberEntity
 from homeassistant.const import UnitOfTemperature, UnitOfTime
 from homeassistant.core import HomeAssistant, callback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .const import COMM_HUB, DOMAIN
+from .const import COMM_HUB, DOMAIN, EntityDescriptor
+from .entity import MpvEntity
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -17,11 +18,10 @@ async def async_setup_entry(hass: HomeAssistant, entry, async_add_entities):
     """Add all myPV number entities."""
     comm = hass.data[DOMAIN][entry.entry_id][COMM_HUB]
 
-    for device in comm.devices:
-        async_add_entities(device.controls)
+    comm.async_add_device_listener(lambda device: async_add_entities(device.controls))
 
 
-class MpvPowerControl(CoordinatorEntity, NumberEntity):
+class MpvPowerControl(MpvEntity, NumberEntity):
     """Representation of myPV power control."""
 
     _attr_has_entity_name = True
@@ -29,14 +29,14 @@ class MpvPowerControl(CoordinatorEntity, NumberEntity):
     _attr_native_min_value = 0
     _attr_native_step = 1
 
-    def __init__(self, device, key, info) -> None:
+    def __init__(self, device, key, desc: EntityDescriptor) -> None:
         """Initialize the control."""
-        super().__init__(device.comm)
+        super().__init__(device.comm, self._coordinator_context(device, key))
         self.device = device
         self.comm = device.comm
         self._key = key
-        self._name = info[0]
-        self._type = info[2]
+        self._name = desc.name
+        self._type = desc.kind
         if device.model == "AC-THOR 9s":
             self._attr_native_max_value = 9000
         elif device.model == "AC ELWA 2":
@@ -44,6 +44,10 @@ class MpvPowerControl(CoordinatorEntity, NumberEntity):
         else:
             self._attr_native_max_value = 3000
 
+    def _coordinator_context(self, device, key):
+        """Return the device keys this control depends on."""
+        return device.listen_context(f"data:{key}")
+
     @property
     def name(self):
         """Return the name of the sensor."""
@@ -73,19 +77,25 @@ class MpvPowerControl(CoordinatorEntity, NumberEntity):
     async def async_set_native_value(self, value: float) -> None:
         """Set the new value."""
         self._attr_native_value = value
-        await self.comm.set_power(self.device, int(value))
+        await self.comm.write_coalescer.async_write(
+            self.device, "power", int(value), partial(self.comm.set_power, self.device)
+        )
 
 
 class MpvPidPowerControl(MpvPowerControl):
     """Representation of myPV pid power control."""
 
-    def __init__(self, device, key, info) -> None:
+    def __init__(self, device, key, desc: EntityDescriptor) -> None:
         """Initialize the switch."""
-        super().__init__(device, key, info)
-        self._name = "PID " + info[0]
+        super().__init__(device, key, desc)
+        self._name = "PID " + desc.name
         self._attr_native_min_value = -8388607
         self._attr_native_max_value = 8388607
 
+    def _coordinator_context(self, device, key):
+        """Refresh with every cycle to track the pending power setting."""
+        return None  # noqa: RET501
+
     @callback
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
@@ -104,15 +114,21 @@ class MpvPidPowerControl(MpvPowerControl):
         self._attr_native_value = value
         self.device.pid_power = value
         self.device.pid_power_set = 1
+        await self.comm.write_coalescer.async_write(
+            self.device, "pid_power", value, self._async_send_pid_power
+        )
+
+    async def _async_send_pid_power(self, value: float) -> bool:
+        """Send pid power, switch device to http control first if needed."""
         http_control_mode = self.device.state_dict["Control State"] == "HTTP"
         while not http_control_mode:
             await self.comm.set_pid_power(self.device, value)
             await asyncio.sleep(1)
             http_control_mode = self.device.state_dict["Control State"] == "HTTP"
-        await self.comm.set_pid_power(self.device, value)
+        return await self.comm.set_pid_power(self.device, value)
 
 
-class MpvSetupControl(CoordinatorEntity, NumberEntity):
+class MpvSetupControl(MpvEntity, NumberEntity):
     """Representation of myPV setup value control."""
 
     _attr_has_entity_name = True
@@ -121,14 +137,14 @@ class MpvSetupControl(CoordinatorEntity, NumberEntity):
     _attr_native_max_value = 80
     _attr_native_step = 1
 
-    def __init__(self, device, key, info) -> None:
+    def __init__(self, device, key, desc: EntityDescriptor) -> None:
         """Initialize the control."""
-        super().__init__(device.comm)
+        super().__init__(device.comm, device.listen_context(f"setup:{key}"))
         self.device = device
         self.comm = device.comm
         self._key = key
-        self._name = info[0]
-        self._type = info[2]
+        self._name = desc.name
+        self._type = desc.kind
         self._unit_of_measurement = UnitOfTemperature.CELSIUS
 
     @property
@@ -167,10 +183,12 @@ class MpvSetupControl(CoordinatorEntity, NumberEntity):
     async def async_set_native_value(self, value: float) -> None:
         """Set the new value."""
         self._attr_native_value = value
-        await self.comm.set_number(self.device, self._key, int(value * 10))
+        await self.comm.write_coalescer.async_write_setup(
+            self.device, self._key, int(value * 10)
+        )
 
 
-class MpvToutControl(CoordinatorEntity, NumberEntity):
+class MpvToutControl(MpvEntity, NumberEntity):
     """Representation of myPV setup value control."""
 
     _attr_has_entity_name = True
@@ -181,7 +199,7 @@ class MpvToutControl(CoordinatorEntity, NumberEntity):
 
     def __init__(self, device, key) -> None:
         """Initialize the control."""
-        super().__init__(device.comm)
+        super().__init__(device.comm, device.listen_context(f"setup:{key}"))
         self.device = device
         self.comm = device.comm
         self._key = key
@@ -222,4 +240,6 @@ class MpvToutControl(CoordinatorEntity, NumberEntity):
     async def async_set_native_value(self, value: float) -> None:
         """Set the new value."""
         self._attr_native_value = value
-        await self.comm.set_number(self.device, self._key, int(value))
+        await self.comm.write_coalescer.async_write_setup(
+            self.device, self._key, int(value)
+        )
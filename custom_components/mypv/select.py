@@ -8,9 +8,9 @@ from homeassistant.components.select import SelectEntity
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .const import COMM_HUB, DOMAIN
+from .const import COMM_HUB, DOMAIN, EntityDescriptor
+from .entity import MpvEntity
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -23,27 +23,33 @@ async def async_setup_entry(
     """Add all myPV select entities."""
     comm = hass.data[DOMAIN][entry.entry_id][COMM_HUB]
 
-    for device in comm.devices:
-        _LOGGER.info(f"Adding {len(device.selects)} select entities for device {device.name}")
+    @callback
+    def async_add_device(device) -> None:
+        """Add the select entities of one device."""
+        _LOGGER.info(
+            f"Adding {len(device.selects)} select entities for device {device.name}"
+        )
         async_add_entities(device.selects)
 
+    comm.async_add_device_listener(async_add_device)
+
 
-class MpvCtrlTypeSelect(CoordinatorEntity, SelectEntity):
+class MpvCtrlTypeSelect(MpvEntity, SelectEntity):
     """Return control type state as select entity."""
 
     _attr_has_entity_name = True
-    _attr_should_poll = True
+    _attr_should_poll = False
     _attr_entity_registry_enabled_default = True
 
-    def __init__(self, device, key: str, info: list) -> None:
+    def __init__(self, device, key: str, desc: EntityDescriptor) -> None:
         """Initialize the select."""
-        super().__init__(device.comm)
+        super().__init__(device.comm, device.listen_context(f"setup:{key}"))
         self.device = device
         self.comm = device.comm
         self.hass = device.comm.hass
         self._key = key
-        self._name = info[0]
-        self._type = info[2]
+        self._name = desc.name
+        self._type = desc.kind
         self._last_value = 0
         self._enum = {
             0: "Auto Detect",
@@ -133,7 +139,7 @@ class MpvCtrlTypeSelect(CoordinatorEntity, SelectEntity):
             if state != self._last_value:
                 self._last_value = state
                 self.async_write_ha_state()
-        except Exception:  # noqa: BLE001
+        except Exception:  # noqa: BLE001, S110
             pass
 
     async def async_select_option(self, option: str) -> None:
@@ -141,10 +147,7 @@ class MpvCtrlTypeSelect(CoordinatorEntity, SelectEntity):
         # Find the key for the selected option
         for key, value in self._enum.items():
             if value == option:
-                await self.comm.set_number(self.device, self._key, key)
-                # Update setup data after setting
-                resp = await self.comm.setup_update(self.device)
-                if resp:
-                    self.device.setup = resp
-                self.async_write_ha_state()
+                await self.comm.write_coalescer.async_write_setup(
+                    self.device, self._key, key
+                )
                 break
@@ -1,34 +1,21 @@
 """Sensors of myPV integration."""
 
-from datetime import timedelta
-from decimal import Decimal
 import logging
-from typing import Any
 
-import pytz
-
-from homeassistant.components.integration.sensor import IntegrationSensor, UnitOfTime
 from homeassistant.components.sensor import (
+    RestoreSensor,
     SensorDeviceClass,
     SensorEntity,
     SensorStateClass,
-    datetime,
-)
-from homeassistant.const import (
-    UnitOfElectricCurrent,
-    UnitOfElectricPotential,
-    UnitOfEnergy,
-    UnitOfFrequency,
-    UnitOfPower,
-    UnitOfTemperature,
 )
+from homeassistant.const import PERCENTAGE, UnitOfTime
 from homeassistant.core import HomeAssistant, callback
-from homeassistant.helpers import device_registry as dr
-from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
-from homeassistant.util import slugify
+from homeassistant.util import dt as dt_util
 
-from .const import COMM_HUB, DOMAIN
+from .const import COMM_HUB, DOMAIN, EntityDescriptor
+from .energy import PERIOD_DAILY, PERIOD_MONTHLY, PERIOD_TOTAL
+from .entity import MpvEntity
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -37,33 +24,38 @@ async def async_setup_entry(hass: HomeAssistant, entry, async_add_entities):
     """Add all myPV sensor entities."""
     comm = hass.data[DOMAIN][entry.entry_id][COMM_HUB]
 
-    for device in comm.devices:
-        async_add_entities(device.sensors)
+    comm.async_add_device_listener(lambda device: async_add_entities(device.sensors))
 
 
-class MpvSensor(CoordinatorEntity, SensorEntity):
+class MpvSensor(MpvEntity, SensorEntity):
     """Representation of myPV sensors."""
 
     _attr_has_entity_name = True
     _attr_state_class = SensorStateClass.MEASUREMENT
-    _attr_should_poll = True
+    _attr_should_poll = False
 
-    def __init__(self, device, key: str, info: list[Any]) -> None:
+    def __init__(self, device, key: str, desc: EntityDescriptor) -> None:
         """Initialize the sensor."""
-        super().__init__(device.comm)
+        super().__init__(device.comm, self._coordinator_context(device, key, desc))
         self.device = device
         self.comm = device.comm
         self.hass = device.comm.hass
         self._key = key
-        self._name = info[0]
-        self._unit_of_measurement = info[1]
-        self._type = info[2]
+        self._desc = desc
+        self._name = desc.name
+        self._unit_of_measurement = desc.unit
+        self._type = desc.kind
         self._last_value = None
-        if key.split("_")[0] in ["power1", "power2", "power3"]:
-            self._attr_entity_category = EntityCategory.DIAGNOSTIC
-            self._attr_entity_registry_enabled_default = (
-                False  # Entity will initally be disabled
+        self._attr_entity_category = desc.category
+        self._attr_entity_registry_enabled_default = desc.enabled_default
+
+    def _coordinator_context(self, device, key: str, desc: EntityDescriptor):
+        """Return the device keys this sensor depends on."""
+        if desc.kind == "power_act":
+            return device.listen_context(
+                f"data:{key}", "data:rel1_out", "data:load_nom"
             )
+        return device.listen_context(f"data:{key}")
 
     @property
     def name(self):
@@ -83,19 +75,7 @@ class MpvSensor(CoordinatorEntity, SensorEntity):
     @property
     def device_class(self):
         """Return device class of sensor."""
-        if self._unit_of_measurement == UnitOfTemperature.CELSIUS:
-            return SensorDeviceClass.TEMPERATURE
-        if self._unit_of_measurement == UnitOfElectricCurrent.AMPERE:
-            return SensorDeviceClass.CURRENT
-        if self._unit_of_measurement == UnitOfElectricPotential.VOLT:
-            return SensorDeviceClass.VOLTAGE
-        if self._unit_of_measurement == UnitOfPower.WATT:
-            return SensorDeviceClass.POWER
-        if self._unit_of_measurement == UnitOfEnergy.KILO_WATT_HOUR:
-            return SensorDeviceClass.ENERGY
-        if self._unit_of_measurement == UnitOfFrequency.HERTZ:
-            return SensorDeviceClass.FREQUENCY
-        return SensorDeviceClass.ENUM
+        return self._desc.device_class
 
     @property
     def state_class(self):
@@ -105,17 +85,7 @@ class MpvSensor(CoordinatorEntity, SensorEntity):
     @property
     def icon(self):
         """Return icon."""
-        if self._name in ["IP", "DNS", "Gateway", "Subnet mask"]:
-            return "mdi:ip-network"
-        if self._name.split()[-1] == "Version":
-            return "mdi:numeric"
-        if self._name.split()[-1] == "Surplus":
-            return "mdi:octagram-plus-outline"
-        if self._name in ["Screen mode", "Power supply state"]:
-            return "mdi:state-machine"
-        if self._name in ["Fan speed"]:
-            return "mdi:fan"
-        return None
+        return self._desc.icon
 
     @property
     def unique_id(self):
@@ -132,6 +102,11 @@ class MpvSensor(CoordinatorEntity, SensorEntity):
             "model": self.device.model,
         }
 
+    async def async_added_to_hass(self) -> None:
+        """Take the current value, later writes follow changed keys only."""
+        await super().async_added_to_hass()
+        self._handle_coordinator_update()
+
     @callback
     def _handle_coordinator_update(self):
         """Handle updated data from the coordinator."""
@@ -145,12 +120,8 @@ class MpvSensor(CoordinatorEntity, SensorEntity):
             state = self._last_value
         if state is None:
             return state
-        if self._unit_of_measurement == UnitOfFrequency.HERTZ:
-            state = state / 1000
-        if self._unit_of_measurement == UnitOfTemperature.CELSIUS:
-            state = state / 10
-        if self._unit_of_measurement == UnitOfElectricCurrent.AMPERE:
-            state = state / 10
+        if self._desc.scale != 1:
+            state = state / self._desc.scale
         self._last_value = state
         self._attr_native_value = state
         self.async_write_ha_state()
@@ -163,7 +134,9 @@ class MpvOutStatSensor(MpvSensor):
     @callback
     def _handle_coordinator_update(self):
         """Handle updated data from the coordinator."""
-        value = self.device.data[self._key]
+        value = self.device.data.get(self._key)
+        if value is None:
+            return
         if isinstance(value, int):
             str_number = str(value).zfill(4)
         elif isinstance(value, str):
@@ -185,9 +158,9 @@ class MpvOutStatSensor(MpvSensor):
 class MpvUpdateSensor(MpvSensor):
     """Return update state from enum."""
 
-    def __init__(self, device, key, info) -> None:
+    def __init__(self, device, key, desc) -> None:
         """Initialize the sensor."""
-        super().__init__(device, key, info)
+        super().__init__(device, key, desc)
         self._last_value = 0
         if device.model == "Solthor":
             self._enum = {
@@ -241,9 +214,9 @@ class MpvUpdateSensor(MpvSensor):
 class MpvDevStatSensor(MpvSensor):
     """Return device state from enum."""
 
-    def __init__(self, device, key, info) -> None:
+    def __init__(self, device, key, desc) -> None:
         """Initialize the sensor."""
-        super().__init__(device, key, info)
+        super().__init__(device, key, desc)
         self._last_value = 1
         if device.model == "Solthor":
             self._enum = {
@@ -277,6 +250,10 @@ class MpvDevStatSensor(MpvSensor):
                 209: "Mainboard Error",
             }
 
+    def _coordinator_context(self, device, key, desc):
+        """Follow the control state instead of a data key."""
+        return device.listen_context("state:State")
+
     @property
     def icon(self):
         """Return icon."""
@@ -297,47 +274,116 @@ class MpvDevStatSensor(MpvSensor):
         try:
             state = self.device.state
             self._last_value = state + 1
-        except Exception:  # noqa: BLE001
+        except Exception:  # noqa: BLE001, S110
             pass
         return self._enum[self._last_value]
 
 
-class MpvEnergySensor(IntegrationSensor, MpvSensor):
-    """Return energy state by integrating power consumption."""
+class MpvStatsSensor(CoordinatorEntity, SensorEntity):
+    """Diagnostic request statistics of a device."""
 
     _attr_has_entity_name = True
-    _attr_should_poll = True
+    _attr_state_class = SensorStateClass.MEASUREMENT
 
-    def __init__(self, device, key, info, source, tz) -> None:
+    def __init__(self, device, key: str, desc: EntityDescriptor) -> None:
         """Initialize the sensor."""
-        self._last_value = 0
-        self._last_reset = None
-        # Get name_by_user from device registry if available
-        devreg = dr.async_get(device.comm.hass)
-        for dev_id in devreg.devices.data:
-            dev = devreg.devices.get(dev_id)
-            if dev is not None:
-                if (DOMAIN, device.serial_number) in dev.identifiers:
-                    self.name_by_user = dev.name_by_user
-                    break
-        if not self.name_by_user:
-            self.name_by_user = device.name
-        self.ha_timezone = tz
-
-        # Explicitly initialize both superclasses
-        IntegrationSensor.__init__(
-            self,
-            device.comm.hass,
-            source_entity=f"sensor.{slugify(self.name_by_user + '_' + source[0])}",
-            name=info[0],
-            round_digits=1,
-            integration_method="trapezoidal",
-            unit_prefix="k",
-            unit_time=UnitOfTime.HOURS,
-            unique_id=f"{device.serial_number}_{info[0]}",
-            max_sub_interval=timedelta(seconds=10),
-        )
-        MpvSensor.__init__(self, device, key, info)
+        # Statistics change with every cycle
+        super().__init__(device.comm, None)
+        self.device = device
+        self.comm = device.comm
+        self._key = key
+        # Statistics are kept in seconds and shares, counts as they are
+        self._scale = {PERCENTAGE: 100, UnitOfTime.MILLISECONDS: 1000}.get(desc.unit)
+        if key == "superseded_writes":
+            self._attr_state_class = SensorStateClass.TOTAL_INCREASING
+        self._attr_name = desc.name
+        self._attr_native_unit_of_measurement = desc.unit
+        self._attr_device_class = desc.device_class
+        self._attr_icon = desc.icon
+        self._attr_unique_id = f"{device.serial_number}_{desc.name}"
+        self._attr_entity_category = desc.category
+        self._attr_entity_registry_enabled_default = desc.enabled_default
+        self._attr_device_info = {
+            "identifiers": {(DOMAIN, device.serial_number)},
+            "name": device.name,
+            "manufacturer": "myPV",
+            "model": device.model,
+        }
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data from the coordinator."""
+        stats = self.comm.stats(self.device.ip)
+        scheduler = self.comm.scheduler(self.device.ip)
+        match self._key:
+            case "latency_p50":
+                value = stats.latency_p50
+            case "latency_p95":
+                value = stats.latency_p95
+            case "cycle_time":
+                value = stats.last_cycle
+            case "queue_depth":
+                value = scheduler.depth_peak
+            case "queue_wait_avg":
+                value = scheduler.wait_avg
+            case "queue_wait_max":
+                value = scheduler.wait_max
+            case "superseded_writes":
+                value = self.comm.write_coalescer.superseded.get(
+                    self.device.serial_number, 0
+                )
+            case _:
+                value = stats.error_rate
+        if value is not None and self._scale:
+            value = round(value * self._scale, 1)
+        self._attr_native_value = value
+        self.async_write_ha_state()
+
+
+class MpvEnergySensor(MpvSensor, RestoreSensor):
+    """Return energy integrated from polled power by the communicator."""
+
+    _attr_should_poll = False
+    _attr_suggested_display_precision = 1
+    _period = PERIOD_TOTAL
+
+    def __init__(self, device, key, desc, source: str) -> None:
+        """Initialize the sensor, source is the integrated power key."""
+        self._source = source
+        self._accumulator = device.energy[source]
+        super().__init__(device, key, desc)
+        self._update_value()
+
+    def _coordinator_context(self, device, key, desc):
+        """Follow the energy of the power key."""
+        return device.listen_context(f"energy:{self._source}")
+
+    async def async_added_to_hass(self) -> None:
+        """Restore before the first state write, energy must not drop to 0."""
+        if not self._accumulator.stored:
+            await self._async_restore()
+        # Writes the first state from the accumulator
+        await super().async_added_to_hass()
+
+    async def _async_restore(self) -> None:
+        """Seed the accumulator from the last state."""
+        last_state = await self.async_get_last_state()
+        last_data = await self.async_get_last_sensor_data()
+        if last_state is None or last_data is None or last_data.native_value is None:
+            return
+        try:
+            value = float(last_data.native_value)
+        except (TypeError, ValueError):
+            _LOGGER.error(
+                "Failed to convert state to float: %s", last_data.native_value
+            )
+            return
+        if self._period == PERIOD_TOTAL:
+            since = last_state.attributes.get("last_reset")
+        else:
+            since = last_state.last_updated.isoformat()
+        self._accumulator.restore(self._period, value, since)
+        self.comm.async_save_energy()
 
     @property
     def icon(self):
@@ -354,85 +400,36 @@ class MpvEnergySensor(IntegrationSensor, MpvSensor):
         """Return device class of sensor."""
         return SensorDeviceClass.ENERGY
 
-    @property
-    def state(self):
-        """Return the state of the device."""
-        return Decimal(self._last_value)
-
-    @property
-    def last_reset(self):
-        """Return last reset of sensor."""
-        return self._last_reset
-
-    @property
-    def unique_id(self):
-        """Return unique id based on device serial and variable."""
-        return f"{self.device.serial_number}_{self._name}"
+    def _update_value(self) -> None:
+        """Take value and last reset of the period from the accumulator."""
+        value = round(self._accumulator.values[self._period], 3)
+        self._last_value = value
+        self._attr_native_value = value
+        last_reset = self._accumulator.last_reset[self._period]
+        self._attr_last_reset = last_reset and dt_util.parse_datetime(last_reset)
 
-    async def async_update(self):
-        """Update the sensor state."""
-        await self.async_get_last_sensor_data()
-        if self._state is None:
-            self._state = Decimal("0.0")
-            self._last_value = 0.0
-            return
-        try:
-            self._last_value = float(self._state)
-        except ValueError:
-            _LOGGER.error("Failed to convert state to float: %s", self._state)
-            self._last_value = 0.0
+    @callback
+    def _handle_coordinator_update(self):
+        """Handle updated data from the coordinator."""
+        self._update_value()
+        self.async_write_ha_state()
 
     async def async_reset(self) -> None:
         """Reset the sensor's state."""
         _LOGGER.info("Resetting energy sensor %s", self.entity_id)
-        self._state = Decimal("0.0")
-        self._last_reset = datetime.now(pytz.utc)
+        self._accumulator.reset(self._period, dt_util.now())
+        self.comm.async_save_energy()
+        self._update_value()
         self.async_write_ha_state()
 
 
 class MpvEnergyDailySensor(MpvEnergySensor):
-    """Return energy state by integrating power consumption."""
+    """Return energy of the current day."""
 
-    def __init__(self, device, key, info, source, tz) -> None:
-        """Initialize the sensor."""
-        super().__init__(device, key, info, source, tz)
-        self._last_reset = datetime.now(self.ha_timezone)
-
-    async def async_update(self):
-        """Update the sensor state."""
-        await self.async_get_last_sensor_data()
-        if datetime.now(self.ha_timezone).date() != self._last_reset.date():
-            await self.async_reset()
-        if self._state is None:
-            self._state = Decimal("0.0")
-            self._last_value = 0.0
-            return
-        try:
-            self._last_value = float(self._state)
-        except ValueError:
-            _LOGGER.error("Failed to convert state to float: %s", self._state)
-            self._last_value = 0.0
+    _period = PERIOD_DAILY
 
 
 class MpvEnergyMonthlySensor(MpvEnergySensor):
-    """Return energy state by integrating power consumption."""
+    """Return energy of the current month."""
 
-    def __init__(self, device, key, info, source, tz) -> None:
-        """Initialize the sensor."""
-        super().__init__(device, key, info, source, tz)
-        self._last_reset = datetime.now(self.ha_timezone)
-
-    async def async_update(self):
-        """Update the sensor state."""
-        await self.async_get_last_sensor_data()
-        if datetime.now(self.ha_timezone).month != self._last_reset.month:
-            await self.async_reset()
-        if self._state is None:
-            self._state = Decimal("0.0")
-            self._last_value = 0.0
-            return
-        try:
-            self._last_value = float(self._state)
-        except ValueError:
-            _LOGGER.error("Failed to convert state to float: %s", self._state)
-            self._last_value = 0.0
+    _period = PERIOD_MONTHLY
@@ -0,0 +1,17 @@
+"""Parser for the text responses of control.html and setup.jsn commands."""
+
+import re
+
+# One 'key=value unit' entry per line, lines end with <br>, \r\n or \n.
+# Lines starting with an html tag are skipped, the value ends at white
+# space or html. The whole text is scanned once by the regex engine.
+_ENTRY = re.compile(r"^[ \t\r]*([^<=\s][^=\n]*)=[ \t]*([^\s<]+)", re.MULTILINE)
+
+
+def parse_state_text(text: str) -> dict[str, str]:
+    """Convert 'key=value unit' lines into a new dict.
+
+    Thousands separators are dropped. Values stay strings, bit fields like
+    Relais=0011 depend on their leading zeros, consumers convert numbers.
+    """
+    return dict(_ENTRY.findall(text.replace("<br>", "\n").replace(",", "")))
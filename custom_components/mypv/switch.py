@@ -1,14 +1,13 @@
 """Switches of myPV integration."""
 
-import asyncio
 import logging
 from typing import Any
 
 from homeassistant.components.switch import SwitchDeviceClass, SwitchEntity
 from homeassistant.core import HomeAssistant, callback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .const import COMM_HUB, DOMAIN
+from .const import COMM_HUB, DOMAIN, EntityDescriptor
+from .entity import MpvEntity
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -20,23 +19,22 @@ async def async_setup_entry(hass: HomeAssistant, entry, async_add_entities):
     """Add all myPV switch entities."""
     comm = hass.data[DOMAIN][entry.entry_id][COMM_HUB]
 
-    for device in comm.devices:
-        async_add_entities(device.switches)
+    comm.async_add_device_listener(lambda device: async_add_entities(device.switches))
 
 
-class MpvSetupSwitch(CoordinatorEntity, SwitchEntity):
+class MpvSetupSwitch(MpvEntity, SwitchEntity):
     """Representation of myPV switch."""
 
     _attr_device_class = SwitchDeviceClass.SWITCH
 
-    def __init__(self, device, key, info) -> None:
+    def __init__(self, device, key, desc: EntityDescriptor) -> None:
         """Initialize the switch."""
-        super().__init__(device.comm)
+        super().__init__(device.comm, device.listen_context(f"setup:{key}"))
         self.device = device
         self.comm = device.comm
         self._key = key
-        self._name = info[0]
-        self._type = info[2]
+        self._name = desc.name
+        self._type = desc.kind
 
     @property
     def name(self):
@@ -72,27 +70,25 @@ class MpvSetupSwitch(CoordinatorEntity, SwitchEntity):
     async def async_turn_on(self, **kwargs: Any) -> None:
         """Instruct the switch to turn on."""
         await self.comm.switch(self.device, self._key, True)
-        await self.device.update()
 
     async def async_turn_off(self, **kwargs: Any) -> None:
         """Instruct the switch to turn off."""
         await self.comm.switch(self.device, self._key, False)
-        await self.device.update()
 
 
-class MpvBoostSwitch(CoordinatorEntity, SwitchEntity):
+class MpvBoostSwitch(MpvEntity, SwitchEntity):
     """Representation of myPV switch."""
 
     _attr_device_class = SwitchDeviceClass.SWITCH
 
-    def __init__(self, device, key, info) -> None:
+    def __init__(self, device, key, desc: EntityDescriptor) -> None:
         """Initialize the switch."""
-        super().__init__(device.comm)
+        super().__init__(device.comm, device.listen_context(f"data:{key}"))
         self.device = device
         self.comm = device.comm
         self._key = key
-        self._name = info[0]
-        self._type = info[2]
+        self._name = desc.name
+        self._type = desc.kind
 
     @property
     def name(self):
@@ -127,23 +123,21 @@ class MpvBoostSwitch(CoordinatorEntity, SwitchEntity):
 
     async def async_turn_on(self, **kwargs: Any) -> None:
         """Instruct the switch to turn on."""
-        await self.comm.switch_boost(self.device, True)
-        await self.device.update()
+        await self.comm.activate_boost(self.device, 1)
 
     async def async_turn_off(self, **kwargs: Any) -> None:
         """Instruct the switch to turn off."""
-        await self.comm.switch_boost(self.device, False)
-        await self.device.update()
+        await self.comm.activate_boost(self.device, 0)
 
 
-class MpvHttpSwitch(CoordinatorEntity, SwitchEntity):
+class MpvHttpSwitch(MpvEntity, SwitchEntity):
     """Representation of myPV switch."""
 
     _attr_device_class = SwitchDeviceClass.SWITCH
 
     def __init__(self, device, key) -> None:
         """Initialize the switch."""
-        super().__init__(device.comm)
+        super().__init__(device.comm, device.listen_context(f"setup:{key}"))
         self.device = device
         self.comm = device.comm
         self._key = key
@@ -183,7 +177,6 @@ class MpvHttpSwitch(CoordinatorEntity, SwitchEntity):
     async def async_turn_on(self, **kwargs: Any) -> None:
         """Instruct the switch to turn on."""
         await self.comm.set_control_mode(self.device, 1)
-        await self.device.update()
 
     async def async_turn_off(self, **kwargs: Any) -> None:
         """Instruct the switch to turn off."""
@@ -0,0 +1,298 @@
+"""Fleet-scale benchmark of the poll cycle against simulated devices.
+
+Starts the devices of tools/mypv_simulator.py on localhost, sets up a bare
+Home Assistant core with one config entry holding all of them and drives
+MypvCommunicator.initialize and _async_update_data directly. Needs an
+environment with homeassistant installed. Run from the repository root:
+
+    python tools/bench_fleet.py [--sizes 1 10 50 200] [--cycles 5]
+        [--output result.json] [--compare baseline.json]
+        [--replay mypv_capture.jsonl [--speed 10]]
+
+Per fleet size it reports startup time, cycle wall time, requests per
+cycle, event loop lag, entity state writes per cycle, RSS and the longest
+request scheduler queue wait. --output stores the result as json,
+--compare prints the relative change of every metric against an earlier
+result file. --replay feeds a capture recorded with the mypv.start_capture
+service through do_get_request instead of simulated devices, --speed 0
+replays without the recorded latencies.
+"""
+
+import argparse
+import asyncio
+import json
+from pathlib import Path
+import resource
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from homeassistant.config_entries import ConfigEntries, ConfigEntry  # noqa: E402
+from homeassistant.core import HomeAssistant  # noqa: E402
+from homeassistant.helpers import (  # noqa: E402
+    device_registry as dr,
+    entity_registry as er,
+    frame,
+)
+
+from custom_components.mypv.capture import ReplayTransport  # noqa: E402
+from custom_components.mypv.communicate import MypvCommunicator  # noqa: E402
+from custom_components.mypv.const import (  # noqa: E402
+    ADAPTIVE_POLLING,
+    CONF_HOSTS,
+    DOMAIN,
+    PARALLEL_POLLS,
+    SERIAL_REQUESTS,
+    UPDATE_INTERVAL,
+)
+from mypv_simulator import start_fleet, stop_fleet  # noqa: E402
+
+DEFAULT_SIZES = [1, 10, 50, 200]
+LAG_TICK = 0.005
+
+
+class LoopLagMonitor:
+    """Measure event loop blocking with a heartbeat task."""
+
+    def __init__(self) -> None:
+        """Initialize counters."""
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+        self._task: asyncio.Task | None = None
+
+    async def _beat(self) -> None:
+        """Sleep a tick, record how late the wake up was."""
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(LAG_TICK)
+            lag = max(0.0, time.perf_counter() - start - LAG_TICK)
+            self.max_lag = max(self.max_lag, lag)
+            self.total_lag += lag
+
+    def start(self) -> None:
+        """Reset counters and start the heartbeat."""
+        self.max_lag = self.total_lag = 0.0
+        self._task = asyncio.get_running_loop().create_task(self._beat())
+
+    async def stop(self) -> None:
+        """Stop the heartbeat."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def rss_mb() -> float:
+    """Return the resident set size in MB, the peak where not available."""
+    try:
+        pages = int(Path("/proc/self/statm").read_text().split()[1])
+        return pages * resource.getpagesize() / 2**20
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (2**20 if sys.platform == "darwin" else 2**10)
+
+
+async def make_hass(config_dir: str) -> HomeAssistant:
+    """Return a bare Home Assistant core with loaded registries."""
+    hass = HomeAssistant(config_dir)
+    frame.async_setup(hass)
+    hass.config_entries = ConfigEntries(hass, {})
+    await dr.async_load(hass)
+    await er.async_load(hass)
+    return hass
+
+
+def make_entry(hass: HomeAssistant, hosts: list[str], options: dict) -> ConfigEntry:
+    """Create a config entry for hosts, registered without being set up."""
+    entry = ConfigEntry(
+        version=1,
+        minor_version=1,
+        domain=DOMAIN,
+        title="myPV benchmark",
+        data={CONF_HOSTS: hosts, UPDATE_INTERVAL: 10},
+        options=options,
+        source="user",
+        unique_id=None,
+        discovery_keys={},
+        subentries_data=None,
+    )
+    # Same as the test helpers do, async_add would set the entry up
+    hass.config_entries._entries[entry.entry_id] = entry  # noqa: SLF001
+    return entry
+
+
+def entities(comm: MypvCommunicator) -> list:
+    """Return all coordinator entities of all devices."""
+    return [
+        entity
+        for device in comm.devices
+        for group in (
+            device.sensors,
+            device.binary_sensors,
+            device.buttons,
+            device.controls,
+            device.selects,
+            device.switches,
+        )
+        for entity in group
+    ]
+
+
+def requests_sent(comm: MypvCommunicator) -> int:
+    """Return the number of requests sent by the communicator."""
+    return sum(
+        endpoint.requests
+        for stats in comm.request_stats.values()
+        for endpoint in stats.endpoints.values()
+    )
+
+
+async def run_size(size: int, args: argparse.Namespace) -> dict:
+    """Benchmark one fleet size, return its metrics."""
+    if args.replay:
+        transport = ReplayTransport.from_file(args.replay, args.speed)
+        fleet = []
+        hosts = transport.hosts[:size]
+    else:
+        transport = None
+        fleet = await start_fleet(
+            size, latency=args.latency / 1000, jitter=args.jitter / 1000
+        )
+        hosts = [sim.host for sim in fleet]
+    options = {
+        PARALLEL_POLLS: args.parallel,
+        SERIAL_REQUESTS: args.serial,
+        ADAPTIVE_POLLING: args.adaptive,
+    }
+    monitor = LoopLagMonitor()
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = await make_hass(config_dir)
+        entry = make_entry(hass, hosts, options)
+        comm = MypvCommunicator(hass, entry)
+        comm.transport = transport
+        rss_before = rss_mb()
+        monitor.start()
+        start = time.perf_counter()
+        await comm.initialize()
+        startup = time.perf_counter() - start
+        await monitor.stop()
+        startup_lag = monitor.max_lag
+
+        writes = 0
+
+        def count_write() -> None:
+            nonlocal writes
+            writes += 1
+
+        all_entities = entities(comm)
+        for entity in all_entities:
+            comm.async_add_listener(count_write, entity.coordinator_context)
+
+        cycles = []
+        for _ in range(args.cycles):
+            await asyncio.sleep(args.interval)
+            requests = requests_sent(comm)
+            writes = 0
+            monitor.start()
+            start = time.perf_counter()
+            await comm._async_update_data()  # noqa: SLF001
+            comm.async_update_listeners()
+            wall = time.perf_counter() - start
+            await monitor.stop()
+            cycles.append(
+                {
+                    "wall": wall,
+                    "requests": requests_sent(comm) - requests,
+                    "writes": writes,
+                    "lag_max": monitor.max_lag,
+                    "lag_total": monitor.total_lag,
+                }
+            )
+        result = {
+            "devices": size,
+            "found": len(comm.devices),
+            "entities": len(all_entities),
+            "startup_s": startup,
+            "startup_lag_max_s": startup_lag,
+            "rss_mb": rss_mb(),
+            "rss_delta_mb": rss_mb() - rss_before,
+            "queue_wait_max_s": max(
+                (sched.wait_max for sched in comm.schedulers.values()), default=0.0
+            ),
+        }
+        for key in ("wall", "requests", "writes", "lag_max", "lag_total"):
+            values = [cycle[key] for cycle in cycles]
+            result[f"cycle_{key}_median"] = statistics.median(values)
+            result[f"cycle_{key}_max"] = max(values)
+        await comm.async_close()
+        await hass.async_stop(force=True)
+    await stop_fleet(fleet)
+    return result
+
+
+def compare(results: list[dict], baseline_file: Path) -> None:
+    """Print the relative change of all metrics against a stored result."""
+    baseline = {
+        res["devices"]: res for res in json.loads(baseline_file.read_text())["results"]
+    }
+    for res in results:
+        base = baseline.get(res["devices"])
+        if base is None:
+            continue
+        print(f"--- {res['devices']} devices")
+        for key, value in res.items():
+            old = base.get(key)
+            if not isinstance(value, (int, float)) or not old:
+                continue
+            print(f"{key:<26} {old:>12.4g} -> {value:>12.4g} {value / old - 1:+8.1%}")
+
+
+async def run(args: argparse.Namespace) -> list[dict]:
+    """Benchmark all requested fleet sizes."""
+    results = []
+    for size in args.sizes:
+        result = await run_size(size, args)
+        print(json.dumps(result), flush=True)
+        results.append(result)
+    return results
+
+
+def main() -> None:
+    """Parse arguments, run the benchmark and store or compare results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--cycles", type=int, default=5)
+    parser.add_argument("--interval", type=float, default=1.0, help="s between")
+    parser.add_argument("--latency", type=float, default=20, help="ms per request")
+    parser.add_argument("--jitter", type=float, default=30, help="ms random extra")
+    parser.add_argument("--parallel", type=int, default=4)
+    parser.add_argument("--serial", action="store_true")
+    parser.add_argument("--adaptive", action="store_true")
+    parser.add_argument("--replay", type=Path, help="capture file to replay")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed")
+    parser.add_argument("--output", type=Path, help="store results as json")
+    parser.add_argument("--compare", type=Path, help="json result to compare to")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.output:
+        report = {
+            "args": vars(args),
+            "python": sys.version.split()[0],
+            "results": results,
+        }
+        args.output.write_text(json.dumps(report, indent=2, default=str))
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Micro-benchmark of the control.html parser against the former implementation.
+
+Run from the repository root:
+
+    python tools/bench_state_parser.py [--number N] [--json] [capture ...]
+
+Each capture is either a file written by the mypv.start_capture service,
+whose control.html responses are benchmarked, or a raw response saved from
+a device, e.g. with curl http://<device>/control.html > control.html.
+Without captures the files in tools/samples are used. Every sample also
+reports if both parsers return the same dict.
+"""
+
+import argparse
+import importlib.util
+import json
+from pathlib import Path
+import timeit
+
+ROOT = Path(__file__).resolve().parents[1]
+SAMPLES = ROOT / "tools" / "samples"
+
+
+def load_parser():
+    """Import state_parser.py directly, the package needs Home Assistant."""
+    path = ROOT / "custom_components" / "mypv" / "state_parser.py"
+    spec = importlib.util.spec_from_file_location("mypv_state_parser", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def legacy_parse(text: str) -> dict[str, str]:
+    """Parse as MypvCommunicator.get_state_dict did before the parser module."""
+    state_dict = {}
+    text = text.replace("\r\n", "<br>").replace("\n", "<br>")
+    resp_lines = text.split("<br>")
+    for line in resp_lines:
+        if len(line) > 4 and not line.startswith("<"):
+            parts = line.split("=")
+            if len(parts) >= 2:
+                state_dict[parts[0]] = parts[1].split()[0].replace(",", "")
+    return state_dict
+
+
+def load_samples(file: Path) -> list[tuple[str, str]]:
+    """Return (name, response text) of all control.html responses in a file."""
+    text = file.read_bytes().decode("utf-8", errors="replace")
+    if file.suffix != ".jsonl":
+        return [(file.name, text)]
+    samples = {}
+    for line in text.splitlines():
+        entry = json.loads(line) if line.strip() else {}
+        if "control.html" in entry.get("u", "") and entry.get("r"):
+            # One response per device is enough
+            samples.setdefault(entry["u"].split("/")[2], entry["r"])
+    return [(f"{file.name}:{host}", resp) for host, resp in samples.items()]
+
+
+def bench(func, text: str, number: int) -> float:
+    """Return best time per call in microseconds."""
+    best = min(timeit.repeat(lambda: func(text), number=number, repeat=5))
+    return best / number * 1e6
+
+
+def main() -> None:
+    """Run the benchmark and print one line per sample."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("captures", nargs="*", type=Path)
+    parser.add_argument("--number", type=int, default=20000)
+    parser.add_argument("--json", action="store_true", help="print json result")
+    args = parser.parse_args()
+
+    state_parser = load_parser()
+    captures = args.captures or sorted(SAMPLES.iterdir())
+    samples = [sample for file in captures for sample in load_samples(file)]
+    results = []
+    for name, text in samples:
+        parsed = state_parser.parse_state_text(text)
+        try:
+            legacy_us = bench(legacy_parse, text, args.number)
+        except IndexError:
+            legacy_us = None  # former parser fails on empty values
+        results.append(
+            {
+                "sample": name,
+                "bytes": len(text),
+                "keys": len(parsed),
+                "same": legacy_us is not None and parsed == legacy_parse(text),
+                "parse_us": round(
+                    bench(state_parser.parse_state_text, text, args.number), 3
+                ),
+                "legacy_us": None if legacy_us is None else round(legacy_us, 3),
+            }
+        )
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(
+        f"{'sample':<36}{'bytes':>7}{'keys':>6}{'same':>6}"
+        f"{'parse us':>11}{'legacy us':>11}"
+    )
+    for res in results:
+        legacy = "failed" if res["legacy_us"] is None else f"{res['legacy_us']:.3f}"
+        same = "yes" if res["same"] else "no"
+        print(
+            f"{res['sample']:<36}{res['bytes']:>7}{res['keys']:>6}{same:>6}"
+            f"{res['parse_us']:>11.3f}{legacy:>11}"
+        )
+
+
+if __name__ == "__main__":
+    main()
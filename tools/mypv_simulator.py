@@ -0,0 +1,424 @@
+"""Local simulator of myPV devices for tests and benchmarks.
+
+Each simulated device serves mypv_dev.jsn, data.jsn, setup.jsn and
+control.html on its own localhost port and reacts to the write requests
+the integration sends:
+
+    control.html?power=N     set heating power, switches to http control
+    control.html?pid_power=N set upper bound for the internal pid control
+    data.jsn?bststrt=0|1     start or stop boost
+    setup.jsn?key=value&...  change setup values, e.g. ctrl=1
+
+Run a fleet from the repository root:
+
+    python tools/mypv_simulator.py --count 10 --model "AC-THOR 9s"
+
+The integration reaches the devices as 127.0.0.1:<port>. The module can
+also be imported, see start_fleet().
+
+--capture writes --polls poll cycles of the fleet to a file in the format
+of the mypv.start_capture service instead of serving, e.g. to replay it
+with tools/bench_fleet.py or to benchmark the parser with
+tools/bench_state_parser.py. tools/samples holds one written with
+
+    python tools/mypv_simulator.py --count 4 --seed 1 --polls 3 \
+        --capture tools/samples/simulated_fleet.jsonl
+"""
+
+import argparse
+import asyncio
+from dataclasses import dataclass, field
+import itertools
+import json
+import random
+import time
+
+from aiohttp import web
+
+# Models as listed in DEVICE_MODELS of the discovery module
+MODELS = {
+    "AC ELWA 2": {"device": "AC ELWA 2", "id": 16150, "max_power": 3500},
+    "AC-THOR": {"device": "AC-THOR", "id": 20100, "max_power": 3000},
+    "AC-THOR 9s": {"device": "AC-THOR", "id": 20300, "max_power": 9000},
+    "SOL-THOR": {"device": "Solthor", "id": 14100, "max_power": 3000},
+}
+
+CTRL_HTTP = 1
+STATE_NAMES = {
+    0: "No control",
+    1: "Heat",
+    2: "Standby",
+    3: "Boost heat",
+    4: "Heat finished",
+}
+
+_serials = itertools.count(1)
+
+
+@dataclass
+class SimulatedDevice:
+    """State of one simulated myPV device."""
+
+    model: str = "AC-THOR"
+    port: int = 0
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    time_scale: float = 1.0
+    serial: str = ""
+    power: int = 0
+    pid_power: int = 0
+    power_until: float = 0.0
+    boost: int = 0
+    temp: int = 450  # 0.1 degC
+    surplus: int = 0
+    setup: dict = field(default_factory=dict)
+    requests: int = 0
+    _last: float = field(default_factory=time.monotonic)
+    _runner: web.AppRunner | None = None
+
+    def __post_init__(self) -> None:
+        """Fill model defaults."""
+        spec = MODELS[self.model]
+        if not self.serial:
+            self.serial = f"{spec['id']}{next(_serials):010d}"
+        self.setup = {
+            "devmode": 1,
+            "bstmode": 1,
+            "ww1target": 600,
+            "ww1boost": 450,
+            "ctrl": CTRL_HTTP,
+            "tout": 60,
+            "maxpwr": spec["max_power"],
+        }
+
+    @property
+    def max_power(self) -> int:
+        """Return maximum heating power of the model."""
+        return MODELS[self.model]["max_power"]
+
+    @property
+    def host(self) -> str:
+        """Return host string as used in the integration config."""
+        return f"127.0.0.1:{self.port}"
+
+    def advance(self) -> None:
+        """Advance the physical model to now."""
+        now = time.monotonic()
+        dt = (now - self._last) * self.time_scale
+        self._last = now
+        if self.power and now > self.power_until:
+            self.power = 0  # control value timeout
+        if self.boost:
+            self.power = self.max_power
+        if self.temp >= self.setup["ww1target"] and not self.boost:
+            self.power = 0
+        elif self.temp >= self.setup["ww1target"] + 50:
+            self.boost = 0
+            self.power = 0
+        # 200 l tank, 0.1 degC units, some heat loss
+        self.temp += int(self.power * dt / 84 - dt / 60)
+        self.temp = max(self.temp, 150)
+        self.surplus = max(0, int(3000 + 2500 * random.uniform(-1, 1)))
+
+    @property
+    def status(self) -> int:
+        """Return device status as reported in data.jsn."""
+        if self.setup["ctrl"] == 0 and not self.boost:
+            return 1
+        if self.boost:
+            return 4
+        if self.power:
+            return 2
+        if self.temp >= self.setup["ww1target"]:
+            return 5
+        return 3
+
+    def info(self) -> dict:
+        """Return mypv_dev.jsn payload."""
+        spec = MODELS[self.model]
+        info = {
+            "device": spec["device"],
+            "sn": self.serial,
+            "fwversion": "00250.00",
+            "number": self.serial[-4:],
+        }
+        if self.model == "AC-THOR 9s":
+            info["acthor9s"] = 2
+        return info
+
+    def data(self) -> dict:
+        """Return data.jsn payload."""
+        now = time.time()
+        data = {
+            "device": MODELS[self.model]["device"],
+            "fwversion": "00250.00",
+            "psversion": "00104.00",
+            "fwversionlatest": "00250.00",
+            "psversionlatest": "00104.00",
+            "upd_state": 0,
+            "ps_upd_state": 0,
+            "screen_mode_flag": 0,
+            "status": self.status,
+            "ctrlstate": "HTTP" if self.setup["ctrl"] == CTRL_HTTP else "Auto",
+            "power": self.power,
+            "power_max": self.max_power,
+            "boostpower": self.max_power if self.boost else 0,
+            "boostactive": self.boost,
+            "legboostnext": 7,
+            "temp1": self.temp,
+            "ww1target": self.setup["ww1target"],
+            "surplus": self.surplus,
+            "m0sum": self.power - self.surplus,
+            "error_state": 0,
+            "blockactive": 0,
+            "volt_mains": 230 + random.randint(-3, 3),
+            "curr_mains": int(self.power / 23),
+            "freq": 50000 + random.randint(-20, 20),
+            "temp_ps": 350 + self.power // 100,
+            "fan_speed": 0 if self.power < 1500 else 1,
+            "ps_state": 0,
+            "cur_ip": "127.0.0.1",
+            "cur_sn": "255.255.255.0",
+            "cur_gw": "127.0.0.1",
+            "cur_dns": "127.0.0.1",
+            "date": time.strftime("%d.%m.%Y", time.localtime(now)),
+            "loctime": time.strftime("%H:%M:%S", time.localtime(now)),
+            "unixtime": int(now),
+            "wifi_list": "",
+            "fsetup": 0,
+        }
+        if self.model == "AC ELWA 2":
+            data |= {"power_elwa2": self.power, "temp2": self.temp - 60}
+        if self.model in ("AC-THOR", "AC-THOR 9s"):
+            data |= {
+                "rel1_out": 0,
+                "load_state": 1,
+                "load_nom": 0,
+                "temp2": self.temp - 80,
+                "power_solar": min(self.power, self.surplus),
+                "power_grid": max(0, self.power - self.surplus),
+            }
+        if self.model == "AC-THOR 9s":
+            third = self.power // 3
+            data |= {
+                "acthor9s": 2,
+                "p9sversion": "00105.00",
+                "p9sversionlatest": "00105.00",
+                "p9s_upd_state": 0,
+                "rel1_out": 1000 if self.power else 0,
+                "power_ac9": self.power,
+                "power_solar_ac9": min(self.power, self.surplus),
+                "power_grid_ac9": max(0, self.power - self.surplus),
+                "volt_L2": 231,
+                "curr_L2": int(third / 23),
+                "volt_L3": 229,
+                "curr_L3": int(third / 23),
+                "power1_solar": third,
+                "power1_grid": 0,
+                "power2_solar": third,
+                "power2_grid": 0,
+                "power3_solar": third,
+                "power3_grid": 0,
+            }
+        if self.model == "SOL-THOR":
+            data |= {
+                "volt_solar": 300 + random.randint(-20, 20),
+                "power_solar_act": self.power,
+                "power_grid_act": 0,
+            }
+        return data
+
+    def control_text(self) -> str:
+        """Return control.html response text."""
+        lines = [
+            f"Device={self.model}",
+            f"State={self.status - 1} {STATE_NAMES.get(self.status - 1, '')}",
+            "Control State=" + ("HTTP" if self.setup["ctrl"] == CTRL_HTTP else "Auto"),
+            f"Power={self.power:,} W",
+            f"PID Power={self.pid_power:,} W",
+            f"Temp1={self.temp} 0.1C",
+            f"Power Timeout={self.setup['tout']} s",
+            f"Boost={self.boost}",
+        ]
+        return "<html><body>\r\n" + "<br>\r\n".join(lines) + "<br>\r\n</body></html>"
+
+    async def _delay(self) -> None:
+        """Emulate the slow embedded web server, maybe fail."""
+        self.requests += 1
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency + random.uniform(0, self.jitter))
+        if self.error_rate and random.random() < self.error_rate:
+            raise web.HTTPServiceUnavailable
+
+    async def handle_info(self, request: web.Request) -> web.Response:
+        """Serve mypv_dev.jsn."""
+        await self._delay()
+        return web.Response(text=json.dumps(self.info()), content_type="text/plain")
+
+    async def handle_data(self, request: web.Request) -> web.Response:
+        """Serve data.jsn, handle boost start."""
+        await self._delay()
+        self.advance()
+        if "bststrt" in request.query:
+            self.boost = int(request.query["bststrt"])
+            self.advance()
+        return web.Response(text=json.dumps(self.data()), content_type="text/plain")
+
+    async def handle_setup(self, request: web.Request) -> web.Response:
+        """Serve setup.jsn, apply all given key=value pairs."""
+        await self._delay()
+        for key, value in request.query.items():
+            try:
+                self.setup[key] = int(value)
+            except ValueError:
+                self.setup[key] = value
+        return web.Response(text=json.dumps(self.setup), content_type="text/plain")
+
+    async def handle_control(self, request: web.Request) -> web.Response:
+        """Serve control.html, handle power commands."""
+        await self._delay()
+        self.advance()
+        if "power" in request.query or "pid_power" in request.query:
+            self.setup["ctrl"] = CTRL_HTTP
+            self.power_until = time.monotonic() + self.setup["tout"] / self.time_scale
+            if "pid_power" in request.query:
+                self.pid_power = int(request.query["pid_power"])
+                value = min(self.pid_power, self.surplus)
+            else:
+                value = int(request.query["power"])
+            self.power = max(0, min(value, self.max_power))
+            self.advance()
+        return web.Response(text=self.control_text(), content_type="text/html")
+
+    async def start(self, host: str = "127.0.0.1") -> None:
+        """Start serving on the configured port, 0 picks a free one."""
+        app = web.Application()
+        app.router.add_get("/mypv_dev.jsn", self.handle_info)
+        app.router.add_get("/data.jsn", self.handle_data)
+        app.router.add_get("/setup.jsn", self.handle_setup)
+        app.router.add_get("/control.html", self.handle_control)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, self.port)
+        await site.start()
+        if not self.port:
+            self.port = self._runner.addresses[0][1]
+
+    async def stop(self) -> None:
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+async def start_fleet(
+    count: int, models: list[str] | None = None, base_port: int = 0, **kwargs
+) -> list[SimulatedDevice]:
+    """Start count devices, cycling through models, return them running."""
+    models = models or list(MODELS)
+    devices = []
+    for idx in range(count):
+        device = SimulatedDevice(
+            model=models[idx % len(models)],
+            port=base_port + idx if base_port else 0,
+            **kwargs,
+        )
+        await device.start()
+        devices.append(device)
+    return devices
+
+
+async def stop_fleet(devices: list[SimulatedDevice]) -> None:
+    """Stop all devices of a fleet."""
+    await asyncio.gather(*(device.stop() for device in devices))
+
+
+def write_capture(path: str, devices: list[SimulatedDevice], polls: int) -> None:
+    """Write poll cycles of all devices to a capture file, without serving.
+
+    Devices heat with half their power on http control, the urls are the
+    ones the integration requests.
+    """
+    for device in devices:
+        device.power = device.max_power // 2
+        device.power_until = float("inf")
+    with open(path, "w", encoding="utf-8") as file:
+        for device in devices:
+            file.write(capture_line(device, "mypv_dev.jsn", json.dumps(device.info())))
+            file.write(capture_line(device, "setup.jsn", json.dumps(device.setup)))
+        for _ in range(polls):
+            for device in devices:
+                device.advance()
+                file.write(capture_line(device, "data.jsn", json.dumps(device.data())))
+                file.write(capture_line(device, "control.html?", device.control_text()))
+
+
+def capture_line(device: SimulatedDevice, endpoint: str, text: str) -> str:
+    """Return one capture record of a response of device."""
+    entry = {
+        "t": round(time.time(), 3),
+        "u": f"http://{device.host}/{endpoint}",
+        "l": round(device.latency, 4),
+        "r": text,
+    }
+    return json.dumps(entry, separators=(",", ":")) + "\n"
+
+
+async def _run(args: argparse.Namespace) -> None:
+    """Run a fleet until interrupted."""
+    devices = await start_fleet(
+        args.count,
+        args.model,
+        args.base_port,
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        error_rate=args.error_rate,
+        time_scale=args.time_scale,
+    )
+    for device in devices:
+        print(f"{device.model:<12} sn {device.serial} at {device.host}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await stop_fleet(devices)
+
+
+def main() -> None:
+    """Parse arguments and run."""
+    parser = argparse.ArgumentParser(description="Simulate myPV devices.")
+    parser.add_argument("--count", type=int, default=1)
+    parser.add_argument(
+        "--model", action="append", choices=list(MODELS), help="repeat to mix"
+    )
+    parser.add_argument("--base-port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=20, help="ms per request")
+    parser.add_argument("--jitter", type=float, default=30, help="ms random extra")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--time-scale", type=float, default=1.0)
+    parser.add_argument("--capture", help="write poll cycles to a capture file")
+    parser.add_argument("--polls", type=int, default=3)
+    parser.add_argument("--seed", type=int, help="seed of the random values")
+    args = parser.parse_args()
+    if args.seed is not None:
+        random.seed(args.seed)
+    if args.capture:
+        models = args.model or list(MODELS)
+        devices = [
+            SimulatedDevice(
+                model=models[idx % len(models)],
+                port=args.base_port + idx,
+                latency=args.latency / 1000,
+            )
+            for idx in range(args.count)
+        ]
+        write_capture(args.capture, devices, args.polls)
+        return
+    try:
+        asyncio.run(_run(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()